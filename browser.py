@@ -1,104 +1,200 @@
 #!/usr/bin/env python3
 """Browser management module with session support and SOTA interactive element analysis."""
 import asyncio
+import functools
+import hashlib
+import heapq
+import inspect
+import json
 import logging
+import mimetypes
+import os
+import tempfile
+import time
 from collections import OrderedDict
-from typing import Dict, List, Optional, Any
+from typing import Dict, List, Optional, Any, AsyncIterator, Awaitable, Callable
 from pathlib import Path
-from playwright.async_api import async_playwright, Browser, Page
+from playwright.async_api import async_playwright, Browser, BrowserContext, Download, Page
+from playwright.async_api import Error as PlaywrightError
 import aiohttp
 import aiofiles
-from urllib.parse import urlparse, unquote
+from urllib.parse import urlparse, unquote, parse_qsl, urlencode
 import re
 
 logger = logging.getLogger(__name__)
 
+_FILENAME_RE = re.compile(r'filename[*]?=["\']?([^;"\']+)')
+_CONTENT_RANGE_SIZE_RE = re.compile(r'/(\d+)$')
+
+# URL path extensions that almost always trigger a download instead of a page load
+_DOWNLOAD_EXTS = frozenset({'dmg', 'exe', 'zip', 'pdf', 'doc', 'docx',
+                            'xls', 'xlsx', 'ppt', 'pptx', 'rar', '7z',
+                            'tar', 'gz', 'iso', 'msi', 'deb', 'rpm'})
+
+
+def _origin(url: str) -> str:
+    """scheme://host[:port] of an http(s) URL, or an empty string for about:, data: and the like"""
+    parsed = urlparse(url)
+    return f"{parsed.scheme}://{parsed.netloc}" if parsed.scheme in ('http', 'https') else ''
+
+
+def url_extension(url: str) -> str:
+    """Lowercased extension (without dot) of the URL path, ignoring query and fragment"""
+    return urlparse(url).path.lower().rpartition('.')[2]
+
+
+@functools.lru_cache(maxsize=None)
+def _load_index_js() -> str:
+    """Analyzer source, read once per process and shared by every BrowserManager"""
+    return Path("index.js").read_text()
+
+
+class _NoStackInspect:
+    """inspect stand-in whose stack() is free; everything else defers to the real module."""
+    stack = staticmethod(lambda *args, **kwargs: [])
+
+    def __getattr__(self, name):
+        return getattr(inspect, name)
+
+
+def disable_playwright_stack_capture() -> bool:
+    """Stop playwright from walking the caller's stack on every API call.
+
+    The stack only feeds trace frames and the "Page.goto:" prefix of error messages, but the
+    walk is a large share of CPU time with many concurrent sessions. Older releases call
+    inspect.stack(), newer ones walk frames in _capture_stack_trace; both are replaced.
+    Returns False when neither hook is found.
+    """
+    try:
+        from playwright._impl import _connection
+    except ImportError:
+        return False
+    if hasattr(_connection, "_capture_stack_trace"):
+        # Fresh dict per call: playwright mutates the result
+        _connection._capture_stack_trace = lambda: {"frames": [], "apiName": "", "title": None}
+        return True
+    if getattr(_connection, "inspect", None) is inspect:
+        _connection.inspect = _NoStackInspect()
+        return True
+    return False
+
+# File metadata memoization: entries live for _METADATA_TTL seconds, at most _METADATA_CACHE_SIZE urls
+_METADATA_TTL = 300.0
+_METADATA_CACHE_SIZE = 512
+
+# Query parameters dropped when building response-cache keys (cache busters, session tokens)
+CACHE_VOLATILE_PARAMS = {'ts', '_', 'sessionid', 'timestamp', 'cb', 'nocache'}
+# Extra per-host volatile parameters, e.g. {'www.example.com': {'token'}}
+CACHE_HOST_VOLATILE_PARAMS: Dict[str, set] = {}
+# Response headers that no longer match the decoded body we store, or that carry per-session state
+_CACHE_DROP_HEADERS = {'content-encoding', 'content-length', 'transfer-encoding', 'set-cookie'}
+# Requests carrying these headers are personalized and bypass the shared cache entirely
+_CACHE_CREDENTIAL_HEADERS = ('cookie', 'authorization')
+# Lifetime of cached responses without a Cache-Control max-age
+_CACHE_DEFAULT_TTL = 3600
+# Eviction trims the cache to this fraction of its budget, so it is not rescanned on every write
+_CACHE_EVICT_TARGET = 0.9
+_MAX_AGE_RE = re.compile(r'(?:^|[,\s])max-age=(\d+)')
+
 
 def extract_filename_from_headers(headers):
     """Extract filename from HTTP headers"""
     content_disposition = headers.get('content-disposition', '')
     if content_disposition:
-        filename_match = re.search(r'filename[*]?=["\']?([^;"\']+)', content_disposition)
+        filename_match = _FILENAME_RE.search(content_disposition)
         if filename_match:
             return unquote(filename_match.group(1))
     return None
 
 
+_MIME_EXTENSIONS = {
+    'application/pdf': '.pdf',
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'text/html': '.html',
+    'text/plain': '.txt',
+    'application/zip': '.zip',
+    'application/json': '.json',
+    'application/xml': '.xml',
+}
+
+
 def get_extension_from_content_type(content_type):
     """Get file extension from content-type"""
-    mime_map = {
-        'application/pdf': '.pdf',
-        'image/jpeg': '.jpg',
-        'image/png': '.png',
-        'image/gif': '.gif',
-        'text/html': '.html',
-        'text/plain': '.txt',
-        'application/zip': '.zip',
-        'application/json': '.json',
-        'application/xml': '.xml',
-    }
     if content_type:
         base_type = content_type.split(';')[0].strip()
-        return mime_map.get(base_type, '')
+        return _MIME_EXTENSIONS.get(base_type, '')
     return ''
 
 
-async def get_file_metadata(url: str, page: Page = None) -> Dict:
+async def get_file_metadata(url: str, session: aiohttp.ClientSession, page: Page = None,
+                            require_network: bool = False) -> Dict:
     """Get file metadata without downloading the entire file"""
+    # Zero-network fast path: the URL path already names a known download type
+    if not require_network and url_extension(url) in _DOWNLOAD_EXTS:
+        filename = unquote(urlparse(url).path.rsplit('/', 1)[-1]) or 'download'
+        return {
+            "filename": filename,
+            "url": url,
+            "size": 0,
+            "content_type": mimetypes.guess_type(filename)[0] or "application/octet-stream",
+            "method": "url_heuristic"
+        }
+
     try:
         # Try HEAD request first
-        async with aiohttp.ClientSession() as session:
-            try:
-                async with session.head(url, allow_redirects=True) as response:
-                    response.raise_for_status()
-
-                    filename = extract_filename_from_headers(response.headers)
-                    if not filename:
-                        parsed_url = urlparse(url)
-                        filename = unquote(parsed_url.path.split('/')[-1])
-                        if not filename or filename.endswith('/'):
-                            filename = 'download'
-                            ext = get_extension_from_content_type(response.headers.get('content-type'))
-                            if ext and not filename.endswith(ext):
-                                filename += ext
-
-                    return {
-                        "filename": filename,
-                        "url": url,
-                        "size": int(response.headers.get('content-length', 0)),
-                        "content_type": response.headers.get('content-type', 'unknown'),
-                        "method": "head_request"
-                    }
-            except Exception as e:
-                logger.info(f"HEAD request failed: {e}, trying partial GET")
-
-                # Fallback to partial GET
-                headers = {'Range': 'bytes=0-0'}
-                async with session.get(url, headers=headers) as response:
-                    if response.status == 206:  # Partial Content
-                        content_range = response.headers.get('content-range', '')
-                        size_match = re.search(r'/(\d+)$', content_range)
-                        size = int(size_match.group(1)) if size_match else 0
-                    else:
-                        size = int(response.headers.get('content-length', 0))
-
-                    filename = extract_filename_from_headers(response.headers)
-                    if not filename:
-                        parsed_url = urlparse(url)
-                        filename = unquote(parsed_url.path.split('/')[-1])
-                        if not filename or filename.endswith('/'):
-                            filename = 'download'
-                            ext = get_extension_from_content_type(response.headers.get('content-type'))
-                            if ext and not filename.endswith(ext):
-                                filename += ext
-
-                    return {
-                        "filename": filename,
-                        "url": url,
-                        "size": size,
-                        "content_type": response.headers.get('content-type', 'unknown'),
-                        "method": "partial_get"
-                    }
+        try:
+            async with session.head(url, allow_redirects=True) as response:
+                response.raise_for_status()
+
+                filename = extract_filename_from_headers(response.headers)
+                if not filename:
+                    parsed_url = urlparse(url)
+                    filename = unquote(parsed_url.path.split('/')[-1])
+                    if not filename or filename.endswith('/'):
+                        filename = 'download'
+                        ext = get_extension_from_content_type(response.headers.get('content-type'))
+                        if ext and not filename.endswith(ext):
+                            filename += ext
+
+                return {
+                    "filename": filename,
+                    "url": url,
+                    "size": int(response.headers.get('content-length', 0)),
+                    "content_type": response.headers.get('content-type', 'unknown'),
+                    "method": "head_request"
+                }
+        except Exception as e:
+            logger.info(f"HEAD request failed: {e}, trying partial GET")
+
+            # Fallback to partial GET
+            headers = {'Range': 'bytes=0-0'}
+            async with session.get(url, headers=headers) as response:
+                if response.status == 206:  # Partial Content
+                    content_range = response.headers.get('content-range', '')
+                    size_match = _CONTENT_RANGE_SIZE_RE.search(content_range)
+                    size = int(size_match.group(1)) if size_match else 0
+                else:
+                    size = int(response.headers.get('content-length', 0))
+
+                filename = extract_filename_from_headers(response.headers)
+                if not filename:
+                    parsed_url = urlparse(url)
+                    filename = unquote(parsed_url.path.split('/')[-1])
+                    if not filename or filename.endswith('/'):
+                        filename = 'download'
+                        ext = get_extension_from_content_type(response.headers.get('content-type'))
+                        if ext and not filename.endswith(ext):
+                            filename += ext
+
+                return {
+                    "filename": filename,
+                    "url": url,
+                    "size": size,
+                    "content_type": response.headers.get('content-type', 'unknown'),
+                    "method": "partial_get"
+                }
 
     except Exception as e:
         logger.error(f"Failed to get file metadata: {e}")
@@ -113,128 +209,567 @@ async def get_file_metadata(url: str, page: Page = None) -> Dict:
             "method": "fallback"
         }
 
+# Runs analyzePage (installed by the context init script) in onlyInteractive mode and
+# numbers its interactive elements: tag, then href or class, then the first text child.
+# Elements are stamped with a data-mcp-id attribute holding their number, and their
+# xpaths stay in the page as window.__mcpXpaths; only display texts come back, and
+# with reuse set they are omitted (texts: null) when identical to the last extraction
+_ANALYZE_JS = """(args) => {
+    const nodes = window.__analyzePage({...args, onlyInteractive: true}).interactive;
+    document.querySelectorAll('[data-mcp-id]').forEach(el => el.removeAttribute('data-mcp-id'));
+    const texts = [];
+    const xpaths = [];
+    for (const node of nodes) {
+        const text = node.text !== null ? ` | ${node.text}` : '';
+        const detail = node.href || (node.className || '').slice(0, 30);
+        texts.push(`${node.tagName || 'element'}${detail ? ' → ' + detail : ''}${text}`.slice(0, 200));
+        xpaths.push(node.xpath || '');
+        if (node.element.setAttribute) node.element.setAttribute('data-mcp-id', String(texts.length));
+    }
+    window.__mcpXpaths = xpaths;
+    // FNV-1a over texts and xpaths: an unchanged element set is not sent again
+    let hash = 2166136261;
+    for (const s of texts.concat(xpaths)) {
+        for (let i = 0; i < s.length; i++) hash = Math.imul(hash ^ s.charCodeAt(i), 16777619);
+        hash = Math.imul(hash ^ 10, 16777619);
+    }
+    const unchanged = args.reuse && window.__mcpHash === hash;
+    window.__mcpHash = hash;
+    return {texts: unchanged ? null : texts, title: document.title, url: location.href};
+}"""
+
+# "mcp=<number>" selector engine: the stamped element, or its stored xpath when a
+# re-render dropped the stamp
+_ELEMENT_SELECTOR_ENGINE = """{
+    query(root, selector) {
+        const stamped = root.querySelector(`[data-mcp-id="${selector}"]`);
+        if (stamped) return stamped;
+        const xpath = (window.__mcpXpaths || [])[Number(selector) - 1];
+        return xpath ? document.evaluate(
+            xpath, document, null, XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue : null;
+    },
+    queryAll(root, selector) {
+        const el = this.query(root, selector);
+        return el ? [el] : [];
+    }
+}"""
+
+def normalize_cache_url(url: str) -> str:
+    """Normalize a URL into a response-cache key by stripping volatile query params"""
+    parsed = urlparse(url)
+    volatile = CACHE_VOLATILE_PARAMS | CACHE_HOST_VOLATILE_PARAMS.get(parsed.hostname or '', set())
+    query = urlencode(sorted((k, v) for k, v in parse_qsl(parsed.query, keep_blank_values=True)
+                             if k.lower() not in volatile))
+    return parsed._replace(query=query, fragment='').geturl()
+
+
+def cache_ttl(cache_control: str) -> Optional[int]:
+    """Seconds a response may be stored for, or None when Cache-Control forbids shared storage"""
+    cache_control = cache_control.lower()
+    if any(d in cache_control for d in ('no-store', 'private', 'no-cache')):
+        return None
+    match = _MAX_AGE_RE.search(cache_control)
+    if match is None:
+        return _CACHE_DEFAULT_TTL
+    return int(match.group(1)) or None
+
+
+def read_cache_entry(path: Path) -> Optional[Dict]:
+    """Read a cached response (JSON header line followed by the raw body); expired entries are deleted"""
+    try:
+        raw = path.read_bytes()
+    except FileNotFoundError:
+        return None
+    header, _, body = raw.partition(b'\n')
+    entry = json.loads(header)
+    if entry.get('expires', 0) <= time.time():
+        path.unlink(missing_ok=True)
+        return None
+    entry['body'] = body
+    os.utime(path)  # Mark as recently used for LRU eviction
+    return entry
+
+
+def write_cache_entry(path: Path, status: int, headers: Dict[str, str], body: bytes, ttl: int) -> int:
+    """Persist a response for ttl seconds; returns the change in cache size in bytes"""
+    path.parent.mkdir(parents=True, exist_ok=True)
+    headers = {k: v for k, v in headers.items() if k.lower() not in _CACHE_DROP_HEADERS}
+    try:
+        old_size = path.stat().st_size
+    except FileNotFoundError:
+        old_size = 0
+    data = json.dumps({'status': status, 'headers': headers, 'expires': time.time() + ttl}).encode() + b'\n' + body
+    # A unique temp name per writer, so concurrent stores of one URL never share a file
+    tmp = tempfile.NamedTemporaryFile(dir=path.parent, suffix='.tmp', delete=False)
+    try:
+        with tmp:
+            tmp.write(data)
+        os.replace(tmp.name, path)
+    except BaseException:
+        os.unlink(tmp.name)
+        raise
+    return len(data) - old_size
+
+
+def evict_cache_entries(cache_dir: Path, max_bytes: int) -> int:
+    """Delete least recently used entries until the cache fits in max_bytes; returns the new total"""
+    entries = [(f.stat(), f) for f in cache_dir.glob('*.bin')]
+    total = sum(st.st_size for st, _ in entries)
+    for st, f in sorted(entries, key=lambda e: e[0].st_mtime):
+        if total <= max_bytes:
+            break
+        f.unlink(missing_ok=True)
+        total -= st.st_size
+    return total
+
 
 class BrowserManager:
     """Manages browser sessions with LRU eviction and SOTA element tracking."""
 
-    def __init__(self, max_sessions: int = 16, headless: bool = False):
+    def __init__(self, max_sessions: int = 16, headless: bool = False,
+                 http_cache_dir: Optional[str] = None, http_cache_max_bytes: int = 256 * 1024 * 1024,
+                 shared_context: bool = False):
         self.max_sessions = max_sessions
+        self.evict_batch = max(1, max_sessions // 16)
         self.headless = headless
+        # Optional on-disk record/replay cache for GET responses, shared by all sessions
+        self.http_cache_dir = Path(http_cache_dir) if http_cache_dir else None
+        self.http_cache_max_bytes = http_cache_max_bytes
+        # Running total of the cache's size; scanned from disk once, then kept up to date per write
+        self._http_cache_bytes: Optional[int] = None
+        # Sessions get only their own page in one shared context: less memory and a shared
+        # HTTP cache, but cookies and storage are shared too
+        self.shared_context = shared_context
+        self._shared_context: Optional[BrowserContext] = None
         self.playwright = None
         self.browser: Optional[Browser] = None
-        self.sessions: OrderedDict[str, Dict] = OrderedDict()
-        self.session_links: Dict[str, Dict[int, str]] = {}
+        self._owns_browser = False
+        self.sessions: Dict[str, Dict] = {}
+        self._last_used: Dict[str, float] = {}
+        self.session_links: Dict[str, List[str]] = {}
         self._session_lock = asyncio.Lock()
+        self._session_locks: Dict[str, asyncio.Lock] = {}
+        self._pending_sessions = 0
+        self._http: Optional[aiohttp.ClientSession] = None
+        self._meta_cache: OrderedDict[str, tuple] = OrderedDict()
+        self._meta_inflight: Dict[str, asyncio.Task] = {}
+        self._extract_inflight: Dict[str, asyncio.Task] = {}
+        self._index_js: Optional[str] = None
+        # Pre-built {'context', 'page'} records claimed by new sessions; topped up in the
+        # background and refilled with recycled evicted sessions
+        self._warm_sessions: asyncio.Queue = asyncio.Queue(maxsize=4)
+        self._warmer_task: Optional[asyncio.Task] = None
+        # Evicted sessions are reset or closed here, off the request path
+        self._cleanup_queue: asyncio.Queue = asyncio.Queue()
+        self._cleanup_task: Optional[asyncio.Task] = None
 
     async def initialize(self):
         """Initialize the browser instance."""
         if not self.browser:
+            # PW_INSPECT_STACK=1 keeps playwright's caller stacks for debugging
+            if os.getenv("PW_INSPECT_STACK", "0") != "1" and not disable_playwright_stack_capture():
+                logger.warning("Playwright stack capture hook not found; leaving it enabled")
             self.playwright = await async_playwright().start()
-            self.browser = await self.playwright.chromium.launch(
-                headless=self.headless,
-                args=['--no-sandbox', '--disable-setuid-sandbox'],
-
+            await self.playwright.selectors.register("mcp", _ELEMENT_SELECTOR_ENGINE)
+            cdp_url = os.getenv("BROWSER_CDP_URL")
+            if cdp_url:
+                # Attach to a Chromium shared with sibling workers; sessions still get their own contexts
+                self.browser = await self.playwright.chromium.connect_over_cdp(cdp_url)
+                self._owns_browser = False
+                logger.info(f"Connected to shared browser at {cdp_url}")
+            else:
+                args = ['--no-sandbox', '--disable-setuid-sandbox']
+                cdp_port = os.getenv("BROWSER_CDP_PORT")
+                if cdp_port:
+                    args += [f'--remote-debugging-port={cdp_port}', '--remote-debugging-address=127.0.0.1']
+                self.browser = await self.playwright.chromium.launch(
+                    headless=self.headless,
+                    args=args,
+
+                )
+                self._owns_browser = True
+                logger.info("Browser initialized")
+                if cdp_port:
+                    logger.info(f"Browser shared over CDP, workers can set BROWSER_CDP_URL=http://127.0.0.1:{cdp_port}")
+        if self._index_js is None:
+            self._index_js = await asyncio.to_thread(_load_index_js)
+        if not self._http:
+            # Shared pool so metadata probes reuse TCP/TLS connections
+            self._http = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=100, ttl_dns_cache=300, enable_cleanup_closed=True),
+                timeout=aiohttp.ClientTimeout(total=15)
             )
-            logger.info("Browser initialized")
+        if self.shared_context and not self._shared_context:
+            self._shared_context = await self._new_context()
+        if not self._warmer_task:
+            self._warmer_task = asyncio.create_task(self._refill_warm())
+        if not self._cleanup_task:
+            self._cleanup_task = asyncio.create_task(self._cleanup_worker())
+
+    async def _new_context(self) -> BrowserContext:
+        """Create a browser context with the analyzer script and optional response cache installed."""
+        context = await self.browser.new_context(
+            proxy={'server':'https_proxy=http://127.0.0.1:8118'},
+            viewport={"width": 1920, "height": 1080})
+        # Installed once per context; survives navigations without re-shipping the source
+        await context.add_init_script(f"window.__analyzePage = {self._index_js};")
+        if self.http_cache_dir:
+            await context.route("**/*", self._cache_route)
+        return context
+
+    async def _new_session_data(self) -> Dict:
+        """Create a session's page, in the shared context or in a context of its own."""
+        if self._shared_context:
+            return {'context': self._shared_context, 'page': await self._shared_context.new_page()}
+        context = await self._new_context()
+        # Origins any page of this context has loaded, so recycling can clear their storage
+        origins = set()
+
+        def track_origins(page: Page):
+            page.on("framenavigated", lambda frame: origins.add(_origin(frame.url)))
+
+        context.on("page", track_origins)
+        try:
+            return {'context': context, 'page': await context.new_page(), 'origins': origins}
+        except BaseException:
+            await context.close()
+            raise
+
+    async def _refill_warm(self):
+        """Keep the warm session queue topped up."""
+        while True:
+            try:
+                session_data = await self._new_session_data()
+            except Exception as e:
+                logger.error(f"Failed to pre-warm context: {e}")
+                await asyncio.sleep(1)
+                continue
+            try:
+                await self._warm_sessions.put(session_data)
+            except asyncio.CancelledError:
+                await self._close_session(session_data)
+                raise
+
+    async def _recycle_session(self, session_data: Dict):
+        """Reset an evicted session and return it to the warm queue, or close it if full.
+
+        Only sessions with a context of their own are recycled: every page (popups included)
+        is replaced by a fresh one, storage of all origins the context loaded is cleared and
+        cookies and permissions are dropped, so nothing reaches the next session id. Pages of
+        the shared context are closed, since sessionStorage and history live in the tab.
+        """
+        if session_data['context'] is not self._shared_context and not self._warm_sessions.full():
+            try:
+                await self._reset_context(session_data)
+                self._warm_sessions.put_nowait(session_data)
+                return
+            except (PlaywrightError, asyncio.QueueFull) as e:
+                logger.info(f"Could not recycle session, closing it: {e}")
+        await self._close_session(session_data)
+
+    @staticmethod
+    async def _reset_context(session_data: Dict):
+        """Wipe a session's browser state in place; the init script and cache route carry over."""
+        context = session_data['context']
+        page = await context.new_page()
+        session_data['page'] = page
+        await asyncio.gather(*(p.close() for p in context.pages if p is not page))
+
+        # localStorage, IndexedDB, service workers, CacheStorage and friends, per origin
+        cdp = await context.new_cdp_session(page)
+        try:
+            for origin in filter(None, session_data['origins']):
+                await cdp.send("Storage.clearDataForOrigin", {"origin": origin, "storageTypes": "all"})
+            await cdp.send("Network.clearBrowserCache")
+        finally:
+            await cdp.detach()
+        session_data['origins'].clear()
+        await context.clear_cookies()
+        await context.clear_permissions()
+
+    async def _cleanup_worker(self):
+        """Recycle or close evicted sessions handed off by get_or_create_session."""
+        while True:
+            session_data = await self._cleanup_queue.get()
+            try:
+                await self._recycle_session(session_data)
+            except Exception as e:
+                logger.error(f"Error recycling session: {e}")
 
     async def close(self):
         """Close all sessions and the browser."""
-        async with self._session_lock:
-            for session_data in self.sessions.values():
+        for task in (self._warmer_task, self._cleanup_task):
+            if task:
+                task.cancel()
                 try:
-                    await session_data['page'].close()
-                    await session_data['context'].close()
-                except Exception as e:
-                    logger.error(f"Error closing session: {e}")
-
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._warmer_task = self._cleanup_task = None
+        while not self._warm_sessions.empty():
+            await self._close_session(self._warm_sessions.get_nowait())
+        while not self._cleanup_queue.empty():
+            await self._close_session(self._cleanup_queue.get_nowait())
+
+        # Detach sessions under the lock, tear them down concurrently outside it
+        async with self._session_lock:
+            snapshot = list(self.sessions.values())
             self.sessions.clear()
+            self._last_used.clear()
             self.session_links.clear()
-
-        if self.browser:
+            self._session_locks.clear()
+        await asyncio.gather(*(self._close_session(sd) for sd in snapshot))
+        if self._shared_context:
+            await self._shared_context.close()
+            self._shared_context = None
+
+        if self._http:
+            await self._http.close()
+        if self.browser and self._owns_browser:
             await self.browser.close()
         if self.playwright:
             await self.playwright.stop()
 
+    async def _close_session(self, session_data: Dict):
+        """Close a session's page and, unless shared, its context, logging failures."""
+        try:
+            await session_data['page'].close()
+            if session_data['context'] is not self._shared_context:
+                await session_data['context'].close()
+        except Exception as e:
+            logger.error(f"Error closing session: {e}")
+
     async def get_or_create_session(self, session_id: str) -> Page:
         """Get existing session or create a new one."""
         await self.initialize()
 
-        async with self._session_lock:
-            if session_id in self.sessions:
-                self.sessions.move_to_end(session_id)
-                return self.sessions[session_id]['page']
-
-            # Evict LRU if at capacity
-            if len(self.sessions) >= self.max_sessions:
-                oldest_id, oldest_data = self.sessions.popitem(last=False)
-                await oldest_data['page'].close()
-                await oldest_data['context'].close()
-                self.session_links.pop(oldest_id, None)
-                logger.info(f"Evicted session: {oldest_id}")
-
-            # Create new session
-            context = await self.browser.new_context(
-                proxy={'server':'https_proxy=http://127.0.0.1:8118'},
-                viewport={"width": 1920, "height": 1080})
-            page = await context.new_page()
-            self.sessions[session_id] = {'context': context, 'page': page}
-            self.session_links[session_id] = {}
+        # Hits only refresh the LRU timestamp and skip the lock
+        session_data = self.sessions.get(session_id)
+        if session_data:
+            self._last_used[session_id] = time.monotonic()
+            return session_data['page']
+
+        # Creation is serialized per session id only, so different sessions open in parallel
+        lock = self._session_locks.get(session_id)
+        if lock is None:
+            lock = self._session_locks[session_id] = asyncio.Lock()
+        async with lock:
+            session_data = self.sessions.get(session_id)
+            if session_data:
+                self._last_used[session_id] = time.monotonic()
+                return session_data['page']
+
+            # At capacity, evict a batch of the least recently used so the next misses in a
+            # burst find free slots. Victims are detached and the slot reserved without
+            # awaiting; their teardown runs in the cleanup worker, off this request
+            if len(self.sessions) + self._pending_sessions >= self.max_sessions and self._last_used:
+                for oldest_id in heapq.nsmallest(self.evict_batch, self._last_used, key=self._last_used.get):
+                    self._cleanup_queue.put_nowait(self.sessions.pop(oldest_id))
+                    del self._last_used[oldest_id]
+                    self.session_links.pop(oldest_id, None)
+                    self._session_locks.pop(oldest_id, None)
+                    logger.info(f"Evicted session: {oldest_id}")
+            self._pending_sessions += 1
+
+            # Create new session, preferring a pre-warmed or recycled one
+            try:
+                if not self._warm_sessions.empty():
+                    session_data = self._warm_sessions.get_nowait()
+                else:
+                    session_data = await self._new_session_data()
+            except BaseException:
+                # Don't keep a lock for a session that never came to exist
+                self._session_locks.pop(session_id, None)
+                raise
+            finally:
+                self._pending_sessions -= 1
+            self.sessions[session_id] = session_data
+            self._last_used[session_id] = time.monotonic()
+            self.session_links[session_id] = []
             logger.info(f"Created session: {session_id}")
 
-            return page
+            return session_data['page']
+
+    async def _cache_route(self, route, request):
+        """Serve anonymous GET requests from the on-disk response cache, recording misses.
+
+        The cache is shared by every session, so requests with cookies or credentials and
+        private/no-store responses never touch it.
+        """
+        if request.method != "GET":
+            await route.continue_()
+            return
+        request_headers = await request.all_headers()
+        if any(h in request_headers for h in _CACHE_CREDENTIAL_HEADERS):
+            await route.continue_()
+            return
+
+        key = hashlib.sha1(normalize_cache_url(request.url).encode()).hexdigest()
+        path = self.http_cache_dir / f"{key}.bin"
+        try:
+            entry = await asyncio.to_thread(read_cache_entry, path)
+        except Exception as e:
+            logger.warning(f"Dropping unreadable cache entry {path}: {e}")
+            entry = None
+        if entry:
+            await route.fulfill(status=entry['status'], headers=entry['headers'], body=entry['body'])
+            return
+
+        try:
+            response = await route.fetch()
+            body = await response.body()
+        except Exception as e:
+            # Let the browser issue the request itself instead of leaving it hanging
+            logger.debug(f"Cache fetch failed for {request.url}: {e}")
+            await route.continue_()
+            return
+        headers = response.headers
+        ttl = cache_ttl(headers.get('cache-control', ''))
+        if (ttl and response.status == 200
+                and 'attachment' not in headers.get('content-disposition', '')):
+            try:
+                await self._store_cache_entry(path, response.status, headers, body, ttl)
+            except Exception as e:
+                logger.warning(f"Failed to cache {request.url}: {e}")
+        await route.fulfill(response=response, body=body)
+
+    async def _store_cache_entry(self, path: Path, status: int, headers: Dict[str, str], body: bytes, ttl: int):
+        """Write one cache entry, scanning the cache directory only when it has outgrown its budget."""
+        if self._http_cache_bytes is None:
+            self._http_cache_bytes = await asyncio.to_thread(evict_cache_entries, self.http_cache_dir,
+                                                             self.http_cache_max_bytes)
+        self._http_cache_bytes += await asyncio.to_thread(write_cache_entry, path, status, headers, body, ttl)
+        if self._http_cache_bytes > self.http_cache_max_bytes:
+            self._http_cache_bytes = await asyncio.to_thread(
+                evict_cache_entries, self.http_cache_dir, int(self.http_cache_max_bytes * _CACHE_EVICT_TARGET))
+
+    async def _get_file_metadata(self, url: str, page: Page = None, require_network: bool = False) -> Dict:
+        """Memoized get_file_metadata; concurrent probes of the same URL share one request."""
+        cached = self._meta_cache.get(url)
+        if cached and time.monotonic() - cached[0] < _METADATA_TTL:
+            self._meta_cache.move_to_end(url)
+            return cached[1]
+
+        if not require_network and url_extension(url) in _DOWNLOAD_EXTS:
+            return await get_file_metadata(url, self._http, page)
+
+        # The probe runs detached so a cancelled caller, the one that started it included,
+        # does not cancel it for the others; each caller only awaits it through a shield
+        task = self._meta_inflight.get(url)
+        if task is None:
+            task = self._meta_inflight[url] = asyncio.create_task(self._probe_file_metadata(url, page))
+            task.add_done_callback(lambda _: self._meta_inflight.pop(url, None))
+        return await asyncio.shield(task)
+
+    async def _probe_file_metadata(self, url: str, page: Page = None) -> Dict:
+        """Probe url over the network and cache the result."""
+        metadata = await get_file_metadata(url, self._http, page, require_network=True)
+
+        # Failed probes are not cached so the next call retries the network
+        if metadata.get("method") != "fallback":
+            self._meta_cache[url] = (time.monotonic(), metadata)
+            self._meta_cache.move_to_end(url)
+            while len(self._meta_cache) > _METADATA_CACHE_SIZE:
+                self._meta_cache.popitem(last=False)
+        return metadata
+
+    @staticmethod
+    async def _run_until_settled(page: Page, action: Callable[[], Awaitable], timeout: float,
+                                 settle: Callable[[], bool] = lambda: True,
+                                 download_window: float = 1000) -> Optional[Download]:
+        """Run action, then wait up to timeout ms for a download or, if settle() allows, network idle.
+
+        The window is measured from when the action completes, not from when the download
+        listener is registered, so a slow navigation or click does not eat into it. Network
+        idle only counts once the main frame has committed a navigation: before that the
+        old document may already be idle, so for the first download_window ms nothing but a
+        download or a commit ends the wait. Returns the download the action started, or None.
+        A download waiter that fails (e.g. the page closed) counts as "no download".
+        """
+        # Registered before the action so early events are not missed; they have no timeout
+        # of their own, the window below bounds them instead
+        download_task = asyncio.ensure_future(page.wait_for_event("download", timeout=0))
+        commit_task = asyncio.ensure_future(page.wait_for_event(
+            "framenavigated", predicate=lambda frame: frame.parent_frame is None, timeout=0))
+        idle_task = None
+        try:
+            # Let both waiters attach their listeners before the action can fire the events
+            await asyncio.sleep(0)
+            await action()
+            loop = asyncio.get_running_loop()
+            deadline = loop.time() + timeout / 1000
+            settle_at = loop.time() + min(download_window, timeout) / 1000
+            waiters = {download_task, commit_task}
+            settling = False
+            while waiters:
+                wait_until = deadline if settling else settle_at
+                done, waiters = await asyncio.wait(waiters, timeout=max(0.0, wait_until - loop.time()),
+                                                   return_when=asyncio.FIRST_COMPLETED)
+                if download_task in done and not download_task.exception():
+                    return download_task.result()
+                if idle_task in done or settling and not done:
+                    break
+                if not settling and (commit_task.done() or not done):
+                    # Committed, or the download window passed without a commit: race network idle
+                    settling = True
+                    waiters.discard(commit_task)
+                    if settle():
+                        idle_task = asyncio.ensure_future(page.wait_for_load_state(
+                            "networkidle", timeout=max(0.0, deadline - loop.time()) * 1000))
+                        waiters.add(idle_task)
+                # Otherwise only a failed waiter finished: keep waiting on the rest
+            return None
+        finally:
+            tasks = [t for t in (download_task, commit_task, idle_task) if t]
+            for task in tasks:
+                if not task.done():
+                    task.cancel()
+            # Collect results so timed-out waiters don't log "exception was never retrieved"
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+    async def _describe_download(self, download: Download, trigger: str, page: Page) -> Dict:
+        """Build download_info from a Playwright download, enriched with file metadata."""
+        basic_info = {
+            "filename": download.suggested_filename,
+            "url": download.url,
+            "detected": True,
+            "status": "started",
+            "trigger": trigger
+        }
+        metadata = await self._get_file_metadata(download.url, page)
+        # What the download itself reports beats the metadata probe's URL heuristics
+        return {**metadata, **basic_info}
 
     async def extract_and_store_links(self, page: Page, session_id: str) -> Dict:
+        """Extract interactive elements; concurrent calls for one session share a single analysis."""
+        # Detached, as in _get_file_metadata: a cancelled caller must not fail the others
+        task = self._extract_inflight.get(session_id)
+        if task is None:
+            task = self._extract_inflight[session_id] = asyncio.create_task(self._extract_links(page, session_id))
+            task.add_done_callback(lambda _: self._extract_inflight.pop(session_id, None))
+        return await asyncio.shield(task)
+
+    async def _extract_links(self, page: Page, session_id: str) -> Dict:
         """Extract interactive elements using SOTA analysis."""
         try:
-            index_js_content = Path("index.js").read_text()
-
-            result = await page.evaluate(f"""
-                const analyzePage = {index_js_content};
-                analyzePage({{
-                    doHighlightElements: true,
-                    focusHighlightIndex: -1,
-                    viewportExpansion: 100,
-                    debugMode: false
-                }});
-            """)
-
-            # Extract interactive elements
-            interactive = [node for _, node in result['map'].items()
-                           if isinstance(node, dict) and node.get('isInteractive')]
-
-            display_elements = []
-            for i, node in enumerate(interactive):
-                tag = node.get('tagName', 'element')
-                text = ''
-
-                # Get text from children
-                if children := node.get('children'):
-                    if child := result['map'].get(children[0]):
-                        if child.get('type') == 'TEXT_NODE':
-                            text = f" | {child.get('text', '')}"
-
-                # Get href or class
-                attrs = node.get('attributes', {})
-                detail = attrs.get('href', '') or attrs.get('class', '')[:30]
-                if detail:
-                    detail = f" → {detail}"
-
-                display_text = f"{tag}{detail}{text}"
-                display_elements.append({
-                    'xpath': node.get('xpath', ''),
-                    'text': display_text[:200]
-                })
-
-            # Store mappings
-            async with self._session_lock:
-                self.session_links[session_id] = {}
-                display_links = []
-
-                for i, element in enumerate(display_elements, 1):
-                    self.session_links[session_id][i] = element['xpath']
-                    display_links.append({'number': i, 'text': element['text']})
-
-            return {"success": True, "links": display_links}
+            # Interactive elements are filtered and formatted in the page; only the
+            # small display list, title and URL come back
+            stored = self.session_links.get(session_id)
+            result = await page.evaluate(_ANALYZE_JS, {
+                "doHighlightElements": True,
+                "focusHighlightIndex": -1,
+                "viewportExpansion": 100,
+                "debugMode": False,
+                "reuse": bool(stored)
+            })
+
+            # Element numbers are dense 1..N; the page keeps the xpaths, only texts are stored here
+            texts = stored if result['texts'] is None else result['texts']
+            display_links = [{'number': i, 'text': text} for i, text in enumerate(texts, 1)]
+            self.session_links[session_id] = texts
+
+            return {"success": True, "links": display_links, "title": result['title'], "url": result['url'],
+                    "unchanged": result['texts'] is None}
 
         except Exception as e:
             logger.error(f"Error extracting elements: {e}")
@@ -245,63 +780,35 @@ class BrowserManager:
         try:
             page = await self.get_or_create_session(session_id)
 
-            # Setup download detection
-            download_info = None
-            download_detected = asyncio.Event()
-
-            async def handle_download(download):
-                nonlocal download_info
-                # Get basic info from download event
-                basic_info = {
-                    "filename": download.suggested_filename,
-                    "url": download.url,
-                    "detected": True,
-                    "status": "started",
-                    "trigger": "navigation"
-                }
-                # Enrich with metadata
-                metadata = await get_file_metadata(download.url, page)
-                download_info = {**basic_info, **metadata}
-                download_detected.set()
-                logger.info(f"Download detected during navigation: {download.suggested_filename}")
-
-            # Register download handler
-            page.on("download", handle_download)
-
             # Check if URL looks like a direct download link
-            is_likely_download = any(url.lower().endswith(ext) for ext in
-                                     ['.dmg', '.exe', '.zip', '.pdf', '.doc', '.docx',
-                                      '.xls', '.xlsx', '.ppt', '.pptx', '.rar', '.7z',
-                                      '.tar', '.gz', '.iso', '.msi', '.deb', '.rpm'])
+            is_likely_download = url_extension(url) in _DOWNLOAD_EXTS
 
             navigation_error = None
-            try:
-                # Try to navigate
-                await page.goto(url, wait_until="commit" if is_likely_download else "domcontentloaded")
-            except Exception as e:
-                navigation_error = e
-                if "net::ERR_ABORTED" in str(e) or "Download is starting" in str(e):
-                    logger.info(f"Navigation aborted due to download: {url}")
-                    try:
-                        await asyncio.wait_for(download_detected.wait(), timeout=2.0)
-                    except asyncio.TimeoutError:
-                        pass
-                else:
-                    raise
 
-            # Wait for potential download
-            if not navigation_error and not download_info:
+            async def goto():
+                nonlocal navigation_error
                 try:
-                    await asyncio.wait_for(download_detected.wait(), timeout=2.0)
-                except asyncio.TimeoutError:
-                    if not is_likely_download:
-                        await page.wait_for_timeout(2000)
+                    await page.goto(url, wait_until="commit" if is_likely_download else "domcontentloaded")
+                except Exception as e:
+                    if "net::ERR_ABORTED" not in str(e) and "Download is starting" not in str(e):
+                        raise
+                    navigation_error = e
+                    logger.info(f"Navigation aborted due to download: {url}")
 
-            # Remove download handler
-            page.remove_listener("download", handle_download)
+            # Race the download event against network idle; an aborted or likely-download
+            # navigation only waits for the download
+            download = await self._run_until_settled(
+                page, goto, timeout=2000,
+                settle=lambda: not navigation_error and not is_likely_download)
+            download_info = None
+            if download:
+                download_info = await self._describe_download(download, "navigation", page)
+                logger.info(f"Download detected during navigation: {download.suggested_filename}")
+            elif navigation_error:
+                raise navigation_error
 
             # Handle direct download case
-            if navigation_error and download_info:
+            if navigation_error:
                 return {
                     "success": True,
                     "url": url,
@@ -310,19 +817,20 @@ class BrowserManager:
                     "download_info": download_info,
                     "action_type": "direct_download"
                 }
-            elif navigation_error:
-                raise navigation_error
 
             # Normal page navigation
-            title = await page.title()
             current_url = page.url
+            title = None
 
-            # Extract links if not a download
+            # Extract links if not a download; the analysis also reports title and URL
             links = []
             if not download_info or not is_likely_download:
                 links_result = await self.extract_and_store_links(page, session_id)
                 if links_result["success"]:
                     links = links_result["links"]
+                    title, current_url = links_result["title"], links_result["url"]
+            if title is None:
+                title = await page.title()
 
             result = {
                 "success": True,
@@ -346,81 +854,44 @@ class BrowserManager:
     async def click_link(self, link_number: int, session_id: str) -> Dict:
         """Click an interactive element with download detection."""
         try:
-            async with self._session_lock:
-                if session_id not in self.session_links:
-                    return {"success": False, "error": "No active session"}
-
-                if link_number not in self.session_links[session_id]:
-                    max_link = len(self.session_links[session_id])
-                    return {"success": False, "error": f"Invalid element number. Available: 1-{max_link}"}
+            texts = self.session_links.get(session_id)
+            if texts is None:
+                return {"success": False, "error": "No active session"}
 
-                xpath = self.session_links[session_id][link_number]
+            if not 1 <= link_number <= len(texts):
+                return {"success": False, "error": f"Invalid element number. Available: 1-{len(texts)}"}
 
             page = await self.get_or_create_session(session_id)
+            before_url = page.url
 
-            # Setup download detection
+            # Click element, then wait for a download or network idle, whichever comes first
+            download = await self._run_until_settled(
+                page, page.locator(f"mcp={link_number}").click, timeout=3000)
             download_info = None
-            download_detected = asyncio.Event()
-
-            async def handle_download(download):
-                nonlocal download_info
-                # Get basic info from download event
-                basic_info = {
-                    "filename": download.suggested_filename,
-                    "url": download.url,
-                    "detected": True,
-                    "status": "started",
-                    "trigger": "click"
-                }
-                # Enrich with metadata
-                metadata = await get_file_metadata(download.url, page)
-                download_info = {**basic_info, **metadata}
-                download_detected.set()
+            if download:
+                download_info = await self._describe_download(download, "click", page)
                 logger.info(f"Download detected from click: {download.suggested_filename}")
 
-            page.on("download", handle_download)
-
-            # Record pre-click state
-            old_url = page.url
-            old_title = await page.title()
-
-            # Click element
-            await page.locator(f'xpath={xpath}').first.click()
-
-            # Wait for potential changes
-            try:
-                await asyncio.wait_for(download_detected.wait(), timeout=3.0)
-            except asyncio.TimeoutError:
-                await page.wait_for_timeout(3000)
-
-            # Remove download handler
-            page.remove_listener("download", handle_download)
-
-            # Determine action type
-            new_url = page.url
-            new_title = await page.title()
-
-            metadata = await get_file_metadata(new_url, page)
-            print(metadata)
-
-            if download_info:
-                action_type = "download"
-            elif new_url != old_url or new_title != old_title:
-                action_type = "navigation"
-            else:
-                action_type = "no_change"
-
-            # Re-analyze page elements
+            # Re-analyze page elements; the page skips sending them again if its element
+            # fingerprint is unchanged, and the same round trip reports the new title and URL
             links_result = await self.extract_and_store_links(page, session_id)
             if not links_result["success"]:
                 return links_result
+            if download_info:
+                action_type = "download"
+            elif links_result["unchanged"] and links_result["url"] == before_url:
+                action_type = "no_change"
+            else:
+                action_type = "navigation"
+            new_url, new_title = links_result["url"], links_result["title"]
+            links = links_result["links"]
 
             result = {
                 "success": True,
                 "action_type": action_type,
                 "url": new_url,
                 "title": new_title,
-                "links": links_result["links"]
+                "links": links
             }
 
             # Add download info if detected
@@ -439,7 +910,7 @@ class BrowserManager:
             page = await self.get_or_create_session(session_id or "download_session")
 
             # Get metadata
-            metadata = await get_file_metadata(url, page)
+            metadata = await self._get_file_metadata(url, page, require_network=True)
 
             # Build download_info
             download_info = {
@@ -462,22 +933,66 @@ class BrowserManager:
 
 # ========== Browser Tool Builder ==========
 
+# Tool input schemas, built once and shared by every create_browser_tools call
+_NAV_SCHEMA = {
+    "type": "object",
+    "required": ["url"],
+    "properties": {
+        "url": {
+            "type": "string",
+            "description": "The URL to navigate to",
+            "pattern": "^https?://",
+            "examples": ["https://example.com", "https://example.com/file.dmg"]
+        }
+    },
+    "additionalProperties": False
+}
+
+_CLICK_SCHEMA = {
+    "type": "object",
+    "required": ["element_number"],
+    "properties": {
+        "element_number": {
+            "type": "integer",
+            "description": "The number of the element to click",
+            "minimum": 1
+        }
+    },
+    "additionalProperties": False
+}
+
+
+def _sid(session) -> str:
+    """Stable per-connection session id, computed once and cached on the MCP session object."""
+    sid = getattr(session, "_cached_sid", None)
+    if sid is None:
+        sid = str(id(session))
+        session._cached_sid = sid
+    return sid
+
+
+class Progress(dict):
+    """Status update yielded by a streaming tool handler; any other yielded item is the tool result."""
+
+
 def create_browser_tools(browser_manager: BrowserManager) -> List[Dict[str, Any]]:
     """Create browser tools with SOTA element interaction."""
 
-    async def navigate(ctx, arguments: dict) -> Dict:
+    async def navigate(ctx, arguments: dict) -> AsyncIterator[Dict]:
         """Navigate to URL with download detection"""
-        session_id = str(id(ctx.session))
-        return await browser_manager.navigate(arguments["url"], session_id)
+        session_id = _sid(ctx.session)
+        yield Progress(status="navigating", url=arguments["url"])
+        yield await browser_manager.navigate(arguments["url"], session_id)
 
-    async def click_element(ctx, arguments: dict) -> Dict:
+    async def click_element(ctx, arguments: dict) -> AsyncIterator[Dict]:
         """Click interactive element by number with download detection"""
-        session_id = str(id(ctx.session))
-        return await browser_manager.click_link(arguments["element_number"], session_id)
+        session_id = _sid(ctx.session)
+        yield Progress(status="clicking", element_number=arguments["element_number"])
+        yield await browser_manager.click_link(arguments["element_number"], session_id)
 
     async def force_download(ctx, arguments: dict) -> Dict:
         """Get file metadata without downloading"""
-        session_id = str(id(ctx.session))
+        session_id = _sid(ctx.session)
         return await browser_manager.force_download(
             arguments["url"],
             session_id
@@ -487,37 +1002,16 @@ def create_browser_tools(browser_manager: BrowserManager) -> List[Dict[str, Any]
         {
             "name": "navigate",
             "description": "Navigate to a URL and analyze interactive elements. Returns download_info if download is detected.",
-            "schema": {
-                "type": "object",
-                "required": ["url"],
-                "properties": {
-                    "url": {
-                        "type": "string",
-                        "description": "The URL to navigate to",
-                        "pattern": "^https?://",
-                        "examples": ["https://example.com", "https://example.com/file.dmg"]
-                    }
-                },
-                "additionalProperties": False
-            },
-            "handler": navigate
+            "schema": _NAV_SCHEMA,
+            "handler": navigate,
+            "streaming": True
         },
         {
             "name": "click_element",
             "description": "Click an interactive element. Returns download_info if download is triggered.",
-            "schema": {
-                "type": "object",
-                "required": ["element_number"],
-                "properties": {
-                    "element_number": {
-                        "type": "integer",
-                        "description": "The number of the element to click",
-                        "minimum": 1
-                    }
-                },
-                "additionalProperties": False
-            },
-            "handler": click_element
+            "schema": _CLICK_SCHEMA,
+            "handler": click_element,
+            "streaming": True
         },
         # {
         #     "name": "force_download",
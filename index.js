@@ -4,9 +4,10 @@
     focusHighlightIndex: -1,
     viewportExpansion: 0,
     debugMode: false,
+    onlyInteractive: false,
   }
 ) => {
-  const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode } = args;
+  const { doHighlightElements, focusHighlightIndex, viewportExpansion, debugMode, onlyInteractive } = args;
   let highlightIndex = 0; // Reset highlight index
 
   // Add caching mechanisms at the top level
@@ -90,6 +91,12 @@
    * @type {Object<string, any>}
    */
   const DOM_HASH_MAP = {};
+  /**
+   * Interactive nodes in id order, flattened for display; only filled with onlyInteractive.
+   *
+   * @type {Array<Object>}
+   */
+  const INTERACTIVE_NODES = [];
 
   const ID = { current: 0 };
 
@@ -1388,6 +1395,17 @@
 
     const id = `${ID.current++}`;
     DOM_HASH_MAP[id] = nodeData;
+    if (onlyInteractive && nodeData.isInteractive) {
+      const child = nodeData.children.length ? DOM_HASH_MAP[nodeData.children[0]] : null;
+      INTERACTIVE_NODES.push({
+        element: node,
+        tagName: nodeData.tagName,
+        xpath: nodeData.xpath,
+        href: nodeData.attributes.href || null,
+        className: nodeData.attributes.class || null,
+        text: child && child.type === "TEXT_NODE" ? child.text : null,
+      });
+    }
     return id;
   }
 
@@ -1396,5 +1414,8 @@
   // Clear the cache before starting
   DOM_CACHE.clearCache();
 
+  if (onlyInteractive) {
+    return { rootId, interactive: INTERACTIVE_NODES };
+  }
   return { rootId, map: DOM_HASH_MAP };
 };
\ No newline at end of file
@@ -4,15 +4,27 @@ import time
 from mcp.client.streamable_http import streamablehttp_client
 from mcp import ClientSession
 
+# 工具列表对所有 session 相同, 只取一次
+_tools = None
+
+
+async def list_tools_cached(session):
+    """返回工具列表, 首次调用后缓存在模块级"""
+    global _tools
+    if _tools is None:
+        _tools = await session.list_tools()
+    return _tools
+
 
 async def worker_task(worker_id, target_url, site_name):
     """工作任务函数"""
     mcp_url = "http://127.0.0.1:8000/mcp"
 
+    # 浏览器服务按 MCP session 隔离浏览器会话 (cookie 等), 每个 worker 保留独立 session
     async with streamablehttp_client(mcp_url) as (read_stream, write_stream, call_back):
         async with ClientSession(read_stream, write_stream) as session:
             await session.initialize()
-            tools=await session.list_tools()
+            tools = await list_tools_cached(session)
 
             for tool in tools.tools:
                 print(tool)
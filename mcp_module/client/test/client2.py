@@ -7,47 +7,48 @@ from mcp.client.streamable_http import streamablehttp_client
 from mcp import ClientSession
 
 
-async def worker_task(worker_id, target_url, site_name):
-    """工作任务函数"""
-    mcp_url = "http://0.0.0.0:8001/mcp"
+async def worker_task(session, worker_id, target_url, site_name):
+    """工作任务函数 (复用 main 中已初始化的 session, 不再逐个 worker 握手)"""
+    # res = await session.call_tool("navigate", arguments={"url": "https://aqllq.sengfeng.cn/channel_4.html?wordId=1170163895025&creativeid=123115745105&bfsemuserid=17022&pid=sembd102615&bd_vid=11092662730189734840"})
+    # print(res.content[0].text)
+    # res = await session.call_tool("click_element", arguments={"element_number": 3})
+    # print(res.content[0].text)
 
-    async with streamablehttp_client(mcp_url) as (read_stream, write_stream, call_back):
-        async with ClientSession(read_stream, write_stream) as session:
-            await session.initialize()
-            print(await session.list_tools())
 
-            # res = await session.call_tool("navigate", arguments={"url": "https://aqllq.sengfeng.cn/channel_4.html?wordId=1170163895025&creativeid=123115745105&bfsemuserid=17022&pid=sembd102615&bd_vid=11092662730189734840"})
-            # print(res.content[0].text)
-            # res = await session.call_tool("click_element", arguments={"element_number": 3})
-            # print(res.content[0].text)
+    res = await session.call_tool("local_search", arguments={"query": 'France'})
+    print()
 
 
-            res = await session.call_tool("local_search", arguments={"query": 'France'})
-            print()
+    # for data in json5.loads(res.content[0].text)[0]['results']:
+    #     data.pop('<coherence>',None)
+    #     print(data)
 
+    print(res.content[0].text)
 
-            # for data in json5.loads(res.content[0].text)[0]['results']:
-            #     data.pop('<coherence>',None)
-            #     print(data)
 
-            print(res.content[0].text)
+    # res = await session.call_tool("force_download", arguments={"url": "https://browser.qq.com/mac"})
+    # print(res.content[0].text)
 
 
-            # res = await session.call_tool("force_download", arguments={"url": "https://browser.qq.com/mac"})
-            # print(res.content[0].text)
+async def main():
+    mcp_url = "http://0.0.0.0:8001/mcp"
 
+    # 搜索服务是无状态的, 所有 worker 共用一次握手建立的 session
+    async with streamablehttp_client(mcp_url) as (read_stream, write_stream, call_back):
+        async with ClientSession(read_stream, write_stream) as session:
+            await session.initialize()
+            print(await session.list_tools())
 
-async def main():
-    # 创建4个并发任务，访问不同的网站
-    tasks = [
-        worker_task(1, "https://nyaa.si/", "Nyaa"),
-        # worker_task(2, "https://www.baidu.com/", "Baidu"),
-        # worker_task(3, "https://huggingface.co/models", "Hugging Face"),
-        # worker_task(4, "https://www.google.com/", "Google")
-    ]
-
-    # 使用 asyncio.gather 并发执行
-    await asyncio.gather(*tasks)
+            # 创建4个并发任务，访问不同的网站
+            tasks = [
+                worker_task(session, 1, "https://nyaa.si/", "Nyaa"),
+                # worker_task(session, 2, "https://www.baidu.com/", "Baidu"),
+                # worker_task(session, 3, "https://huggingface.co/models", "Hugging Face"),
+                # worker_task(session, 4, "https://www.google.com/", "Google")
+            ]
+
+            # 使用 asyncio.gather 并发执行
+            await asyncio.gather(*tasks)
 
 
 if __name__ == "__main__":
@@ -1,8 +1,9 @@
 #!/usr/bin/env python3
 """Browser Query MCP 服务器 - 获取并切分网页内容"""
 from mcp.server.fastmcp import FastMCP
-from playwright.sync_api import sync_playwright
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+# search 导入时已把仓库根目录加入 sys.path
+from search import fetch_text
+from mcp_module.web.text_split import split_text
 
 
 class MCPBrowserQueryServer:
@@ -16,12 +17,6 @@ class MCPBrowserQueryServer:
             chunk_size: 文本块大小，默认 2048
         """
         self.chunk_size = chunk_size
-        self.splitter = RecursiveCharacterTextSplitter(
-            chunk_size=chunk_size,
-            chunk_overlap=0,
-            length_function=len,
-            separators=["\n\n", "\n", " ", ""]
-        )
 
         # 创建 MCP 实例
         if port:
@@ -35,7 +30,7 @@ class MCPBrowserQueryServer:
         """注册 MCP 工具"""
 
         @self.mcp.tool()
-        def fetch(url: str):
+        async def fetch(url: str):
             """获取并切分网页内容
 
             Args:
@@ -45,27 +40,18 @@ class MCPBrowserQueryServer:
                 切分后的内容块，格式为 L0, L1, L2...
             """
             try:
-                # 获取网页内容
-                with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True)
-                    page = browser.new_page()
-                    page.goto(url, wait_until='domcontentloaded')
-                    content = page.inner_text('*')
-                    browser.close()
+                # 获取网页内容 (静态页面直接 HTTP, 否则共享浏览器)
+                content = await fetch_text(url)
 
                 # 切分内容
-                chunks = self.splitter.split_text(content)
+                chunks = split_text(content, self.chunk_size)
 
                 # 格式化输出
-                formatted_chunks = []
-                for i, chunk in enumerate(chunks):
-                    formatted_chunks.append(f"L{i}\n{chunk}")
-
                 return {
                     'url': url,
                     'total_chunks': len(chunks),
                     'chunk_size': self.chunk_size,
-                    'content': '\n\n'.join(formatted_chunks)
+                    'content': '\n\n'.join(f"L{i}\n{chunk}" for i, chunk in enumerate(chunks))
                 }
 
             except Exception as e:
@@ -1,14 +1,93 @@
 #!/usr/bin/env python3
 """极简搜索 MCP 服务器"""
+import asyncio
+import sys
+from pathlib import Path
+
+import aiohttp
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
 from mcp.server.fastmcp import FastMCP
-from playwright.sync_api import sync_playwright
+from playwright.async_api import async_playwright
+
+# 作为脚本在本目录运行时, 把仓库根目录加入 sys.path 以复用 mcp_module.web 的公共工具
+_ROOT = str(Path(__file__).resolve().parents[3])
+if _ROOT not in sys.path:
+    sys.path.insert(0, _ROOT)
+from mcp_module.web.html_text import html_to_text  # noqa: E402
+
+# 复用 TCP/TLS 连接的 HTTP 会话, 所有搜索请求共用
+_SESSION = requests.Session()
+_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16,
+                       max_retries=Retry(total=2, backoff_factor=0.2))
+_SESSION.mount('http://', _adapter)
+_SESSION.mount('https://', _adapter)
+
+# 进程内共享的浏览器, 首次 fetch 时启动; 每个请求只新建独立的 context
+_playwright = None
+_browser = None
+_browser_lock = asyncio.Lock()
+
+
+async def get_browser():
+    """获取共享的 Chromium 实例 (加锁保证只启动一次)"""
+    global _playwright, _browser
+    async with _browser_lock:
+        if _browser is None:
+            _playwright = await async_playwright().start()
+            _browser = await _playwright.chromium.launch(headless=True)
+    return _browser
+
+
+async def fetch_page_text(url: str) -> str:
+    """在独立 context 中打开网页并返回 body 文本"""
+    browser = await get_browser()
+    context = await browser.new_context()
+    try:
+        page = await context.new_page()
+        await page.goto(url, wait_until='domcontentloaded')
+        # 只取 body: '*' 会匹配 html 根并连带 head/script/style 子树
+        return await page.inner_text('body')
+    finally:
+        await context.close()
+
+
+# 静态页面文本少于该长度且含 <script> 时, 视为需要 JS 渲染
+_MIN_STATIC_TEXT = 200
+
+_http = None
+
+
+async def fetch_static_text(url: str):
+    """直接 HTTP 获取网页文本; 非 HTML 或疑似 JS 渲染的页面返回 None"""
+    global _http
+    if _http is None:
+        _http = aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=15))
+    async with _http.get(url) as r:
+        r.raise_for_status()
+        if 'html' not in r.headers.get('content-type', ''):
+            return None
+        html = await r.text()
+    text = html_to_text(html)
+    if len(text) < _MIN_STATIC_TEXT and '<script' in html.lower():
+        return None
+    return text
+
+
+async def fetch_text(url: str) -> str:
+    """获取网页文本: 先走直接 HTTP 快速路径, 失败或需要 JS 渲染时再用浏览器"""
+    try:
+        text = await fetch_static_text(url)
+    except Exception:
+        text = None
+    return text if text is not None else await fetch_page_text(url)
 
 
 def searxng_search(query: str, searxng_url: str, max_results: int = 5) -> list:
     """SearxNG 搜索实现"""
     try:
-        r = requests.get(
+        r = _SESSION.get(
             f"{searxng_url}/search",
             params={'q': query, 'format': 'json', 'categories': 'general'},
             timeout=30
@@ -29,7 +108,7 @@ def searxng_search(query: str, searxng_url: str, max_results: int = 5) -> list:
 def tavily_search(query: str, api_key: str, max_results: int = 5) -> list:
     """Tavily 搜索实现"""
     try:
-        r = requests.post(
+        r = _SESSION.post(
             "https://api.tavily.com/search",
             json={
                 "api_key": api_key,
@@ -74,24 +153,19 @@ class MCPSearchServer:
         """注册 MCP 工具"""
 
         @self.mcp.tool()
-        def search(query: str, max_results: int = 5):
+        async def search(query: str, max_results: int = 5):
             """搜索网络"""
+            # requests 是同步的, 放到线程里执行以免阻塞事件循环
             if self.search_engine == "searxng":
-                return searxng_search(query, self.searxng_url, max_results)
+                return await asyncio.to_thread(searxng_search, query, self.searxng_url, max_results)
             else:
-                return tavily_search(query, self.tavily_api_key, max_results)
+                return await asyncio.to_thread(tavily_search, query, self.tavily_api_key, max_results)
 
         @self.mcp.tool()
-        def fetch(url: str):
+        async def fetch(url: str):
             """获取网页文本内容"""
             try:
-                with sync_playwright() as p:
-                    browser = p.chromium.launch(headless=True)
-                    page = browser.new_page()
-                    page.goto(url, wait_until='domcontentloaded')
-                    content = page.inner_text('*')
-                    browser.close()
-                    return {'url': url, 'content': content}
+                return {'url': url, 'content': await fetch_text(url)}
             except Exception as e:
                 return {'error': str(e), 'url': url}
 
@@ -113,13 +187,5 @@ if __name__ == "__main__":
         searxng_url=SEARXNG_URL,
         tavily_api_key=TAVILY_API_KEY
     )
-    server.run()
-
-    print(1)
-    server2 = MCPSearchServer(
-        search_engine=SEARCH_ENGINE,
-        searxng_url=SEARXNG_URL,
-        tavily_api_key=TAVILY_API_KEY,
-        port=8001
-    )
-    server2.run()
\ No newline at end of file
+    # run() 会一直阻塞; 同时运行多个实例请使用 test.py 中的多进程方式
+    server.run()
\ No newline at end of file
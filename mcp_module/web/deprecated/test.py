@@ -1,36 +1,41 @@
 #!/usr/bin/env python3
 """多个 MCP 服务器运行示例"""
-import threading
 from multiprocessing import Process
 from search import MCPSearchServer
 
+# 每个服务器的构造参数
+SERVER_CONFIGS = [
+    dict(
+        search_engine="tavily",
+        tavily_api_key="your-key",
+        port=8000
+    ),
+    dict(
+        search_engine="searxng",
+        searxng_url="http://localhost:8888",
+        port=8001
+    )
+]
 
-# 方法1: 使用多线程
-def run_with_threads():
-    """使用多线程运行多个服务器"""
-    servers = [
-        MCPSearchServer(
-            search_engine="tavily",
-            tavily_api_key="your-key",
-            port=8000
-        ),
-        MCPSearchServer(
-            search_engine="searxng",
-            searxng_url="http://localhost:8888",
-            port=8001
-        )
-    ]
-
-    threads = []
-    for server in servers:
-        thread = threading.Thread(target=server.run)
-        thread.daemon = True  # 主程序退出时自动结束
-        thread.start()
-        threads.append(thread)
+
+def _run(config: dict):
+    """子进程入口: 在子进程内构造并运行服务器 (事件循环和监听 socket 不能跨进程共享)"""
+    MCPSearchServer(**config).run()
+
+
+# 方法1: 使用多进程
+def run_with_processes(configs=SERVER_CONFIGS):
+    """每个服务器一个进程, 各自拥有独立的事件循环和 GIL"""
+    procs = [Process(target=_run, args=(config,), daemon=True) for config in configs]
+    for proc in procs:
+        proc.start()
 
     print("所有服务器已启动！")
 
-    # 等待所有线程
-    for thread in threads:
-        thread.join()
+    # 等待所有进程
+    for proc in procs:
+        proc.join()
+
 
+if __name__ == "__main__":
+    run_with_processes()
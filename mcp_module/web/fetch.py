@@ -2,13 +2,24 @@ import asyncio
 import json
 import os
 import re
-from typing import Dict, Any
+import time
+from collections import OrderedDict
+from typing import Dict, Any, List
 
-from langchain.text_splitter import RecursiveCharacterTextSplitter
 from openai import AsyncOpenAI
 from playwright.async_api import async_playwright
 
-from .prompt import WEB_SUMMARY_PROMPT, CHUNK_SELECTION_PROMPT, FINAL_SELECTION_PROMPT
+from .html_text import html_to_text
+from .llm_cache import LLMCache
+from .text_split import split_text
+from .prompt import (
+    WEB_SUMMARY_SYSTEM, WEB_SUMMARY_PROMPT,
+    CHUNK_SELECTION_SYSTEM, CHUNK_SELECTION_PROMPT,
+    FINAL_SELECTION_SYSTEM, FINAL_SELECTION_PROMPT
+)
+
+# 提取文本用不到的资源类型, 导航时直接中止以节省带宽; 可通过 hidden_params 覆盖
+BLOCKED_RESOURCES = ('image', 'font', 'media', 'stylesheet')
 
 # ========== 工具配置 ==========
 FETCH_CONFIG = {
@@ -34,6 +45,7 @@ FETCH_CONFIG = {
         'window_size': 16,  # 16个chunks per window
         'max_per_window': 5,
         'final_max': 10,
+        'blocked_resources': BLOCKED_RESOURCES,
         'api_base': os.getenv('OPENAI_API_BASE', 'https://api.openai.com/v1'),
         'api_key': os.getenv('OPENAI_API_KEY', 'sk-your-api-key-here'),
         'model': os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
@@ -55,7 +67,33 @@ FETCH_CHUNKED_CONFIG = {
         'required': ['url']
     },
     'hidden_params': {
-        'chunk_size': 2048  # 默认切分大小
+        'chunk_size': 2048,  # 默认切分大小
+        'blocked_resources': BLOCKED_RESOURCES
+    }
+}
+
+FETCH_BATCH_CONFIG = {
+    'name': 'fetch_batch',
+    'description': '并发获取多个网页的内容',
+    'schema': {
+        'type': 'object',
+        'properties': {
+            'urls': {
+                'type': 'array',
+                'items': {'type': 'string', 'format': 'uri'},
+                'description': '要获取的网页URL列表'
+            },
+            'max_concurrency': {
+                'type': 'integer',
+                'description': '同时打开的页面数上限',
+                'default': 5,
+                'minimum': 1
+            }
+        },
+        'required': ['urls']
+    },
+    'hidden_params': {
+        'blocked_resources': BLOCKED_RESOURCES
     }
 }
 
@@ -78,6 +116,7 @@ FETCH_SUMMARY_CONFIG = {
         'required': ['url', 'query']
     },
     'hidden_params': {
+        'blocked_resources': BLOCKED_RESOURCES,
         'api_base': os.getenv('OPENAI_API_BASE', 'https://ms-shpc7pdz-100034032793-sw.gw.ap-shanghai.ti.tencentcs.com/ms-shpc7pdz/v1'),
         'api_key': os.getenv('OPENAI_API_KEY', 'sk-your-api-key-here'),
         'model': os.getenv('OPENAI_MODEL', 'gpt-4o-mini')
@@ -85,63 +124,180 @@ FETCH_SUMMARY_CONFIG = {
 }
 
 
+# ========== 共享浏览器 ==========
+_LAUNCH_ARGS = [
+    '--no-sandbox',
+    '--disable-blink-features=AutomationControlled',
+    '--disable-infobars',
+    '--disable-background-timer-throttling',
+    '--disable-popup-blocking',
+    '--disable-backgrounding-occluded-windows',
+    '--disable-renderer-backgrounding',
+    '--disable-window-activation',
+    '--disable-focus-on-load',
+    '--no-first-run',
+    '--no-default-browser-check',
+    '--no-startup-window',
+    '--window-position=0,0',
+    # '--window-size=1280,1000',
+]
+
+# 进程内共享的 Playwright + Chromium, 首次获取网页时启动; 每个请求只新建独立的 context
+_pw = None
+_browser = None
+_browser_lock = asyncio.Lock()
+
+
+async def _get_browser():
+    """获取共享的 Chromium 实例 (加锁保证只启动一次)"""
+    global _pw, _browser
+    async with _browser_lock:
+        if _browser is None:
+            _pw = await async_playwright().start()
+            _browser = await _pw.chromium.launch(headless=True, args=_LAUNCH_ARGS)
+    return _browser
+
+
+async def close_browser():
+    """关闭共享浏览器 (服务关闭时调用, 未启动过则什么也不做)"""
+    global _pw, _browser
+    async with _browser_lock:
+        if _browser is not None:
+            await _browser.close()
+            await _pw.stop()
+            _pw = _browser = None
+
+
+async def _render_text(url: str, timeout: float = None, blocked_resources=BLOCKED_RESOURCES) -> str:
+    """在独立 context 中打开网页并返回文本, 结束时关闭 context
+
+    只通过 CDP 取一次 HTML, 文本在进程内解析 (线程池中执行, 不阻塞事件循环),
+    避免 inner_text 让 Chromium 为整个 DOM 计算布局文本。
+    timeout 为导航超时 (毫秒), 默认沿用 Playwright 的 30 秒;
+    blocked_resources 中的资源类型 (图片、字体等) 请求直接中止。
+    """
+    browser = await _get_browser()
+    context = await browser.new_context()
+    try:
+        if blocked_resources:
+            blocked = frozenset(blocked_resources)
+
+            async def block(route):
+                if route.request.resource_type in blocked:
+                    await route.abort()
+                else:
+                    await route.continue_()
+
+            await context.route('**/*', block)
+        page = await context.new_page()
+        await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+        html = await page.content()
+    finally:
+        await context.close()
+    return await asyncio.to_thread(html_to_text, html)
+
+
+# ========== 共享 LLM 客户端 ==========
+def _messages(system: str, prompt: str) -> list:
+    """固定指令放在 system 消息 (可命中服务商前缀缓存), 可变内容放在其后的 user 消息"""
+    return [{"role": "system", "content": system}, {"role": "user", "content": prompt}]
+
+
+# LLM 响应缓存; 设置 OPENAI_EMBEDDING_MODEL 时额外启用语义近似匹配
+_llm_cache = LLMCache(embedding_model=os.getenv('OPENAI_EMBEDDING_MODEL'))
+
+# (api_base, api_key) -> AsyncOpenAI, 复用其 HTTP 连接池; 键来自工具配置, 数量很少
+_openai_clients: Dict[tuple, AsyncOpenAI] = {}
+
+
+def _get_openai_client(api_base: str, api_key: str) -> AsyncOpenAI:
+    """获取 (api_base, api_key) 对应的共享 AsyncOpenAI 客户端, 首次使用时创建"""
+    client = _openai_clients.get((api_base, api_key))
+    if client is None:
+        client = _openai_clients[(api_base, api_key)] = AsyncOpenAI(api_key=api_key, base_url=api_base)
+    return client
+
+
+async def close_openai_clients():
+    """关闭所有共享的 LLM 客户端 (服务关闭时调用)"""
+    clients = list(_openai_clients.values())
+    _openai_clients.clear()
+    await asyncio.gather(*(client.close() for client in clients))
+
+
+# 成功结果短时缓存 ((url, timeout, blocked_resources) -> (时间戳, 结果)), 以及同键正在渲染的 Task
+_PAGE_TTL = 60
+_PAGE_CACHE_SIZE = 128
+_page_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+_page_inflight: Dict[tuple, asyncio.Task] = {}
+
+
 # ========== 异步网页获取函数 ==========
-async def fetch_page(url: str) -> dict:
-    """异步获取网页内容"""
+async def _fetch_page(url: str, timeout: float = None, blocked_resources=BLOCKED_RESOURCES) -> dict:
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=False
-                                              ,                                      args=[
-                                          '--no-sandbox',
-                                          '--disable-blink-features=AutomationControlled',
-                                          '--disable-infobars',
-                                          '--disable-background-timer-throttling',
-                                          '--disable-popup-blocking',
-                                          '--disable-backgrounding-occluded-windows',
-                                          '--disable-renderer-backgrounding',
-                                          '--disable-window-activation',
-                                          '--disable-focus-on-load',
-                                          '--no-first-run',
-                                          '--no-default-browser-check',
-                                          '--no-startup-window',
-                                          '--window-position=0,0',
-                                          # '--window-size=1280,1000',
-                                      ]
-
-
-
-                                              )
-            page = await browser.new_page()
-            await page.goto(url, wait_until='domcontentloaded')
-            content = await page.inner_text('*')
-            await browser.close()
-            return {'url': url, 'content': content}
+        content = await _render_text(url, timeout, blocked_resources)
+        return {'url': url, 'content': content}
     except Exception as e:
         return {'error': str(e), 'url': url}
 
 
-async def fetch_chunked(url: str, chunk_size: int = 2000) -> dict:
+async def _fetch_and_cache(key: tuple, url: str, timeout: float, blocked_resources) -> dict:
+    """渲染一次并缓存成功结果; 作为独立 Task 运行, 不受任何单个调用方取消的影响"""
+    try:
+        result = await _fetch_page(url, timeout, blocked_resources)
+    finally:
+        _page_inflight.pop(key, None)
+    if 'error' not in result:
+        _page_cache[key] = (time.monotonic(), result)
+        _page_cache.move_to_end(key)
+        while len(_page_cache) > _PAGE_CACHE_SIZE:
+            _page_cache.popitem(last=False)
+    return result
+
+
+async def fetch_page(url: str, timeout: float = None, blocked_resources=BLOCKED_RESOURCES) -> dict:
+    """异步获取网页内容
+
+    相同 (url, timeout, blocked_resources) 的并发请求共享一次渲染; 成功结果缓存 _PAGE_TTL 秒,
+    失败不缓存以便下次重试。渲染在独立 Task 中进行, 某个调用方被取消时其余调用方照常拿到结果。
+    """
+    key = (url, timeout, tuple(blocked_resources or ()))
+    cached = _page_cache.get(key)
+    if cached and time.monotonic() - cached[0] < _PAGE_TTL:
+        _page_cache.move_to_end(key)
+        return cached[1]
+
+    task = _page_inflight.get(key)
+    if task is None:
+        task = _page_inflight[key] = asyncio.ensure_future(_fetch_and_cache(key, url, timeout, blocked_resources))
+    return await asyncio.shield(task)
+
+
+async def fetch_pages(urls: List[str], max_concurrency: int = 5,
+                      blocked_resources=BLOCKED_RESOURCES) -> List[dict]:
+    """并发获取多个网页, 信号量限制同时打开的 context 数; 结果顺序与 urls 一致
+
+    单个网页失败只影响对应结果 (返回 {'error', 'url'}), 不会中断整批。
+    """
+    sem = asyncio.Semaphore(max(1, max_concurrency))
+
+    async def fetch_one(url):
+        async with sem:
+            return await fetch_page(url, timeout=15000, blocked_resources=blocked_resources)
+
+    return await asyncio.gather(*(fetch_one(url) for url in urls))
+
+
+async def fetch_chunked(url: str, chunk_size: int = 2000, blocked_resources=BLOCKED_RESOURCES) -> dict:
     """异步获取并切分网页内容"""
     try:
-        async with async_playwright() as p:
-            browser = await p.chromium.launch(headless=True)
-            page = await browser.new_page()
-            await page.goto(url, wait_until='domcontentloaded')
-            content = await page.inner_text('*')
-            await browser.close()
-
-        # 切分操作在事件循环中执行
-        loop = asyncio.get_event_loop()
-
-        def split_content():
-            splitter = RecursiveCharacterTextSplitter(
-                chunk_size=chunk_size, chunk_overlap=0,
-                length_function=len, separators=["\n\n", "\n", " ", ""]
-            )
-            chunks = splitter.split_text(content)
-            return [f"L{i}\n{chunk}" for i, chunk in enumerate(chunks)]
+        result = await fetch_page(url, blocked_resources=blocked_resources)
+        if 'error' in result:
+            return result
+        content = result['content']
 
-        formatted_chunks = await loop.run_in_executor(None, split_content)
+        # 单遍切分只有 O(n) 的 rfind 和切片, 直接在事件循环中执行
+        formatted_chunks = [f"L{i}\n{chunk}" for i, chunk in enumerate(split_text(content, chunk_size))]
 
         return {
             'url': url, 'total_chunks': len(formatted_chunks),
@@ -156,12 +312,13 @@ async def fetch_summary(
         query: str,
         api_base: str = 'https://api.openai.com/v1',
         api_key: str = 'sk-your-api-key-here',
-        model: str = 'gpt-4o-mini'
+        model: str = 'gpt-4o-mini',
+        blocked_resources=BLOCKED_RESOURCES
 ) -> dict:
     """异步获取网页内容并生成摘要"""
     try:
         # 获取网页内容
-        result = await fetch_page(url)
+        result = await fetch_page(url, blocked_resources=blocked_resources)
         if 'error' in result:
             return result
 
@@ -174,16 +331,17 @@ async def fetch_summary(
         )
         print(api_base)
 
-        # 初始化 AsyncOpenAI
-        client = AsyncOpenAI(
-            api_key=api_key,
-            base_url=api_base
-        )
+        # 获取共享的 AsyncOpenAI 客户端
+        client = _get_openai_client(api_base, api_key)
 
         # 调用 LLM
-        response = await client.chat.completions.create(
+        # 语义匹配只比较查询, 且仅限同一网页的同一内容
+        response = await _llm_cache.create(
+            client,
+            query=query,
+            scope=(url, content[:35000]),
             model=model,
-            messages=[{"role": "user", "content": prompt}],
+            messages=_messages(WEB_SUMMARY_SYSTEM, prompt),
             temperature=0.7,
             top_p=0.8,
             extra_body={
@@ -216,44 +374,45 @@ async def fetch(
         final_max: int = 10,
         api_base: str = 'https://api.openai.com/v1',
         api_key: str = 'sk-your-api-key-here',
-        model: str = 'gpt-4o-mini'
+        model: str = 'gpt-4o-mini',
+        blocked_resources=BLOCKED_RESOURCES
 ) -> dict:
     """智能提取网页相关内容"""
     try:
         # 1. 获取网页内容
-        result = await fetch_page(url)
+        result = await fetch_page(url, blocked_resources=blocked_resources)
         if 'error' in result:
             return result
 
         content = result['content']
 
-        # 2. 切分成chunks
-        chunks = []
-        for i in range(0, len(content), chunk_size):
-            chunk = content[i:i + chunk_size]
-            chunks.append(chunk)
+        # 2. 按固定长度切分: 只记录每块起始偏移, 完整的块文本等被选中后才切片
+        starts = range(0, len(content), chunk_size)
+        total_chunks = len(starts)
 
-        if not chunks:
+        if not total_chunks:
             return {'error': 'No content to process', 'url': url}
 
-        # 3. 创建窗口（不重叠）
-        windows = []
-        for i in range(0, len(chunks), window_size):
-            window = chunks[i:i + window_size]
-            window_start = i
-            windows.append((window, window_start))
+        # 送给 LLM 的只是每块的前 200 字符预览, 一次性构建, 两个阶段共用
+        previews = [
+            f"{content[start:start + 200]}..." if min(chunk_size, len(content) - start) > 200
+            else content[start:start + chunk_size]
+            for start in starts
+        ]
+
+        # 3. 创建窗口（不重叠）: (窗口内块数, 起始块号)
+        windows = [(min(window_size, total_chunks - i), i) for i in range(0, total_chunks, window_size)]
 
-        # 4. 初始化 AsyncOpenAI
-        client = AsyncOpenAI(api_key=api_key, base_url=api_base)
+        # 4. 获取共享的 AsyncOpenAI 客户端
+        client = _get_openai_client(api_base, api_key)
 
         # 5. 并行处理每个窗口
         async def process_window(window_data):
-            window_chunks, start_idx = window_data
+            window_len, start_idx = window_data
 
             # 构建chunks文本
             chunks_text = "\n\n".join([
-                f"[{i}]:\n{chunk[:200]}..." if len(chunk) > 200 else f"[{i}]:\n{chunk}"
-                for i, chunk in enumerate(window_chunks)
+                f"[{i}]:\n{previews[start_idx + i]}" for i in range(window_len)
             ])
 
             prompt = CHUNK_SELECTION_PROMPT.format(
@@ -262,9 +421,12 @@ async def fetch(
                 max_selections=max_per_window
             )
 
-            response = await client.chat.completions.create(
+            response = await _llm_cache.create(
+                client,
+                query=query,
+                scope=(url, chunks_text, max_per_window),
                 model=model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=_messages(CHUNK_SELECTION_SYSTEM, prompt),
                 temperature=0.7,
                 top_p=0.8,
                 extra_body={
@@ -280,7 +442,7 @@ async def fetch(
                 # 解析返回的数字列表
                 selected = json.loads(response.choices[0].message.content)
                 # 转换为全局索引
-                return [(start_idx + idx, chunks[start_idx + idx]) for idx in selected if idx < len(window_chunks)]
+                return [start_idx + idx for idx in selected if 0 <= idx < window_len]
             except:
                 return []
 
@@ -296,17 +458,16 @@ async def fetch(
         # 去重（保持顺序）
         seen = set()
         unique_selected = []
-        for idx, chunk in all_selected:
+        for idx in all_selected:
             if idx not in seen:
                 seen.add(idx)
-                unique_selected.append((idx, chunk))
+                unique_selected.append(idx)
 
         # 6. 第二阶段筛选（如果需要）
         if len(unique_selected) > final_max:
             # 构建已选chunks的文本
             chunks_text = "\n\n".join([
-                f"[{i}]:\n{chunk[:200]}..." if len(chunk) > 200 else f"[{i}]:\n{chunk}"
-                for i, (_, chunk) in enumerate(unique_selected)
+                f"[{i}]:\n{previews[idx]}" for i, idx in enumerate(unique_selected)
             ])
 
             prompt = FINAL_SELECTION_PROMPT.format(
@@ -315,9 +476,12 @@ async def fetch(
                 final_max=final_max
             )
 
-            response = await client.chat.completions.create(
+            response = await _llm_cache.create(
+                client,
+                query=query,
+                scope=(url, chunks_text, final_max),
                 model=model,
-                messages=[{"role": "user", "content": prompt}],
+                messages=_messages(FINAL_SELECTION_SYSTEM, prompt),
                 temperature=0.1,
                 max_tokens=100
             )
@@ -329,15 +493,15 @@ async def fetch(
                 # 如果解析失败，截取前final_max个
                 unique_selected = unique_selected[:final_max]
 
-        # 7. 按原始顺序排序并拼接
-        unique_selected.sort(key=lambda x: x[0])
-        final_content = "\n\n".join([chunk for _, chunk in unique_selected])
+        # 7. 按原始顺序排序, 只对选中的块切片并拼接
+        unique_selected.sort()
+        final_content = "\n\n".join([content[idx * chunk_size:(idx + 1) * chunk_size] for idx in unique_selected])
 
         return {
             'url': url,
             'query': query,
             'selected_chunks': len(unique_selected),
-            'total_chunks': len(chunks),
+            'total_chunks': total_chunks,
             'content': final_content,
             'model': model
         }
@@ -363,6 +527,14 @@ def get_fetch_chunked_config() -> Dict[str, Any]:
     }
 
 
+def get_fetch_batch_config() -> Dict[str, Any]:
+    """获取 fetch_batch 工具配置"""
+    return {
+        **FETCH_BATCH_CONFIG,
+        'func': fetch_pages
+    }
+
+
 def get_fetch_summary_config() -> Dict[str, Any]:
     """获取 fetch_summary 工具配置"""
     return {
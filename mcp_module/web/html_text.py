@@ -0,0 +1,53 @@
+from html.parser import HTMLParser
+
+# 优先使用 selectolax (C 实现的 lexbor 解析器) 提取 HTML 文本, 未安装时回退到标准库
+try:
+    from selectolax.parser import HTMLParser as _LexborParser
+except ImportError:
+    _LexborParser = None
+
+# 不可见或非正文的标签, 其子树文本不输出
+_SKIP_TAGS = {'script', 'style', 'noscript', 'template', 'head'}
+
+
+class _TextExtractor(HTMLParser):
+    """标准库回退: 收集 script/style/head 之外的文本节点
+
+    head 单独记录, 遇到 </head> 或 <body> 即结束; 缺少 </head> 的网页不会因此丢掉整个正文
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+        self._skip = 0
+        self._in_head = False
+
+    def handle_starttag(self, tag, attrs):
+        if tag == 'head':
+            self._in_head = True
+        elif tag == 'body':
+            self._in_head = False
+        elif tag in _SKIP_TAGS:
+            self._skip += 1
+
+    def handle_endtag(self, tag):
+        if tag == 'head':
+            self._in_head = False
+        elif tag in _SKIP_TAGS and self._skip:
+            self._skip -= 1
+
+    def handle_data(self, data):
+        if not self._skip and not self._in_head and data.strip():
+            self.parts.append(data.strip())
+
+
+def html_to_text(html: str) -> str:
+    """提取 HTML 正文文本, 按行分隔"""
+    if _LexborParser is not None:
+        tree = _LexborParser(html)
+        for node in tree.css(','.join(_SKIP_TAGS - {'head'})):
+            node.decompose()
+        return tree.body.text(separator='\n', strip=True) if tree.body else ''
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    return '\n'.join(extractor.parts)
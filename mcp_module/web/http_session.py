@@ -0,0 +1,23 @@
+from typing import Optional
+
+import aiohttp
+
+# 进程内共享的 aiohttp 会话: 复用 TCP/TLS 连接 (keep-alive) 并缓存 DNS, 首次请求时创建
+_session: Optional[aiohttp.ClientSession] = None
+
+
+async def get_session() -> aiohttp.ClientSession:
+    """获取共享的 aiohttp 会话 (已关闭时重新创建)"""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+            limit=100, limit_per_host=20, ttl_dns_cache=300, keepalive_timeout=60))
+    return _session
+
+
+async def close_session():
+    """关闭共享会话 (服务关闭时调用, 未创建过则什么也不做)"""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
@@ -0,0 +1,142 @@
+"""LLM 响应缓存: 精确匹配 + 可选的语义近似匹配
+
+第一层按 sha256(model, messages, temperature 等请求参数) 精确命中;
+第二层 (配置了 embedding 模型且安装了 numpy 时启用) 只对调用方给出的用户查询做 embedding,
+并且只在 scope 完全相同的已缓存请求中按余弦相似度查找, 不低于阈值即复用其响应。
+scope 由调用方给出, 应包含除查询外决定回答的全部输入 (网页内容、块预览、数量上限等),
+与模型及其余请求参数一起哈希; 不同网页或同一模板的不同数据因此永远不会互相命中。
+"""
+import hashlib
+import json
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# numpy 仅用于语义层的向量检索; 未安装时只使用精确匹配
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# 送去做 embedding 的文本上限 (字符), 避免超出 embedding 模型的输入长度
+_EMBED_MAX_CHARS = 8000
+
+
+class LLMCache:
+    """chat.completions 响应的进程内 TTL + LRU 缓存"""
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 3600, similarity: float = 0.92,
+                 embedding_model: Optional[str] = None):
+        """
+        Args:
+            maxsize: 缓存的响应条数上限, 超出时淘汰最久未用的
+            ttl: 条目有效期 (秒)
+            similarity: 语义命中所需的最低余弦相似度
+            embedding_model: embedding 模型名, 为空时不启用语义层
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.similarity = similarity
+        self.embedding_model = embedding_model if np is not None else None
+        # key -> (时间戳, scope 键或 None, 响应, 向量槽位或 None)
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        # 语义层: 预分配的单位向量矩阵, 槽位循环复用; _slot_keys[i] 为占用槽位 i 的 key
+        self._vectors = None
+        self._slot_keys: list = []
+        self._next_slot = 0
+
+    @staticmethod
+    def make_key(request: Dict[str, Any]) -> str:
+        """请求参数的 sha256, 作为精确匹配的键"""
+        data = json.dumps(request, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(data.encode()).hexdigest()
+
+    async def create(self, client, query: Optional[str] = None, scope: Any = None, **request):
+        """带缓存的 client.chat.completions.create(**request)
+
+        Args:
+            query: 用户查询原文, 给出时 (连同 scope) 才参与语义匹配
+            scope: 除查询外决定回答的输入, 需可 JSON 序列化; 为 None 时只做精确匹配
+        """
+        key = self.make_key(request)
+        response = self._get(key)
+        if response is not None:
+            return response
+
+        scope_key = vector = None
+        if self.embedding_model and query and scope is not None:
+            params = {k: v for k, v in request.items() if k != 'messages'}
+            scope_key = self.make_key({'scope': scope, 'params': params})
+            # embedding 失败时退回只用精确匹配, 不影响正常调用
+            try:
+                vector = await self._embed(client, query)
+            except Exception:
+                vector = None
+            if vector is not None:
+                response = self._search(scope_key, vector)
+                if response is not None:
+                    return response
+
+        response = await client.chat.completions.create(**request)
+        self._put(key, scope_key, response, vector)
+        return response
+
+    def _get(self, key: str):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if time.monotonic() - entry[0] >= self.ttl:
+            self._drop(key)
+            return None
+        self._entries.move_to_end(key)
+        return entry[2]
+
+    def _put(self, key: str, scope_key: Optional[str], response, vector):
+        if key in self._entries:
+            self._drop(key)
+        slot = self._store_vector(key, vector) if vector is not None else None
+        self._entries[key] = (time.monotonic(), scope_key, response, slot)
+        while len(self._entries) > self.maxsize:
+            self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: str):
+        entry = self._entries.pop(key, None)
+        if entry and entry[3] is not None and self._slot_keys[entry[3]] == key:
+            self._slot_keys[entry[3]] = None
+
+    # ========== 语义层 ==========
+    async def _embed(self, client, text: str):
+        """对查询文本做 embedding, 返回单位向量"""
+        result = await client.embeddings.create(model=self.embedding_model, input=text[:_EMBED_MAX_CHARS])
+        vector = np.asarray(result.data[0].embedding, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _store_vector(self, key: str, vector) -> int:
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            # 首次使用或 embedding 维度变化时重建矩阵
+            self._vectors = np.zeros((self.maxsize, vector.shape[0]), dtype=np.float32)
+            self._slot_keys = [None] * self.maxsize
+            self._next_slot = 0
+        slot = self._next_slot
+        self._next_slot = (slot + 1) % self.maxsize
+        old = self._slot_keys[slot]
+        if old is not None and old != key:
+            self._drop(old)
+        self._vectors[slot] = vector
+        self._slot_keys[slot] = key
+        return slot
+
+    def _search(self, scope_key: str, vector):
+        """在 scope 键相同的缓存条目中找查询相似度最高且不低于阈值的响应"""
+        if self._vectors is None or self._vectors.shape[1] != vector.shape[0]:
+            return None
+        slots = [i for i, key in enumerate(self._slot_keys)
+                 if key is not None and key in self._entries and self._entries[key][1] == scope_key]
+        if not slots:
+            return None
+        scores = self._vectors[slots] @ vector
+        best = int(np.argmax(scores))
+        if scores[best] < self.similarity:
+            return None
+        return self._get(self._slot_keys[slots[best]])
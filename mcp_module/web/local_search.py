@@ -3,6 +3,8 @@ import json
 from typing import Dict, Any
 from async_lru import alru_cache
 
+from .http_session import get_session
+
 # ========== 工具配置 ==========
 LOCAL_SEARCH_CONFIG = {
     'name': 'local_search',
@@ -32,31 +34,31 @@ async def local_search(query: str, **kwargs) -> list:
     params = {**LOCAL_SEARCH_CONFIG['hidden_params'], **kwargs}
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                    params['endpoint'],
-                    json={'queries': [query]},
-                    timeout=aiohttp.ClientTimeout(total=params['timeout'])
-            ) as resp:
-                if resp.status == 200:
-                    results = await resp.json()
-                    # 解析结果并返回top_k个
-                    parsed = []
-                    for r in results[:1]:  # 单查询返回
-                        datas = json.loads(r) if isinstance(r, str) else r
+        session = await get_session()
+        async with session.post(
+                params['endpoint'],
+                json={'queries': [query]},
+                timeout=aiohttp.ClientTimeout(total=params['timeout'])
+        ) as resp:
+            if resp.status == 200:
+                results = await resp.json()
+                # 解析结果并返回top_k个
+                parsed = []
+                for r in results[:1]:  # 单查询返回
+                    datas = json.loads(r) if isinstance(r, str) else r
 
-                        # 清理不需要的字段
-                        if 'results' in datas:
-                            for data in datas['results']:
-                                data.pop('<coherence>', None)
+                    # 清理不需要的字段
+                    if 'results' in datas:
+                        for data in datas['results']:
+                            data.pop('<coherence>', None)
 
-                        # if isinstance(datas, list):
-                        #     parsed.extend(datas[:params['top_k']])
-                        # else:
-                        #     parsed.append(datas)
+                    # if isinstance(datas, list):
+                    #     parsed.extend(datas[:params['top_k']])
+                    # else:
+                    #     parsed.append(datas)
 
-                    return datas
-                return [{'error': f'HTTP {resp.status}'}]
+                return datas
+            return [{'error': f'HTTP {resp.status}'}]
     except Exception as e:
         return [{'error': f'Local search error: {e}'}]
 
@@ -1,48 +1,58 @@
-"""提示词管理模块"""
+"""提示词管理模块
 
-# ========== 网页摘要提示词 ==========
-WEB_SUMMARY_PROMPT = """你是一个专业的内容分析助手。请根据用户的查询需求，对以下网页内容进行精准摘要。
-
-用户查询：{query}
+每个提示词拆成两部分: *_SYSTEM 是不含任何占位符的固定指令, 作为 system 消息放在最前;
+*_PROMPT 只包含随请求变化的字段 (查询、网页内容、块数等), 作为 user 消息放在最后。
+服务商的前缀缓存 (prompt caching) 按请求开头的相同内容命中, 因此固定部分里不要插入变量,
+新增提示词也请遵守 "固定在前, 可变在后" 的顺序。
+"""
 
-网页内容：
-{content}
+# ========== 网页摘要提示词 ==========
+WEB_SUMMARY_SYSTEM = """你是一个专业的内容分析助手。请根据用户的查询需求，对用户给出的网页内容进行精准摘要。
 
 要求：
 1. 重点关注与用户查询相关的信息
 2. 保持客观准确，不添加原文没有的信息
 3. 摘要应该简洁明了，突出重点
-4. 如果内容与查询无关，请明确说明
+4. 如果内容与查询无关，请明确说明"""
 
-请提供摘要："""
+WEB_SUMMARY_PROMPT = """用户查询：{query}
 
-# ========== 文档块选择提示词 ==========
-CHUNK_SELECTION_PROMPT = """You are analyzing document chunks to find information relevant to a user query.
+网页内容：
+{content}
 
-User Query: {query}
+请提供摘要："""
 
-Document chunks:
-{chunks_text}
+# ========== 文档块选择提示词 ==========
+CHUNK_SELECTION_SYSTEM = """You are analyzing document chunks to find information relevant to a user query.
 
-Select up to {max_selections} chunks that are most relevant to answering the query.
+Select the chunks that are most relevant to answering the query, up to the limit given with the chunks.
 Return ONLY a JSON array of chunk numbers, like: [0, 3, 7, 12]
 
 Selection criteria:
 - Direct relevance to the query
 - Contains key information
-- Provides context or evidence
+- Provides context or evidence"""
+
+CHUNK_SELECTION_PROMPT = """User Query: {query}
+
+Document chunks:
+{chunks_text}
+
+Select up to {max_selections} chunks.
 
 Your response:"""
 
 # ========== 最终筛选提示词 ==========
-FINAL_SELECTION_PROMPT = """From these pre-selected relevant chunks, choose the {final_max} MOST important ones.
+FINAL_SELECTION_SYSTEM = """From the pre-selected relevant chunks, choose the MOST important ones, up to the limit given with the chunks.
+
+Return ONLY a JSON array of chunk numbers from the ones shown.
+Choose chunks that best answer the query with minimum redundancy."""
 
-User Query: {query}
+FINAL_SELECTION_PROMPT = """User Query: {query}
 
 Selected chunks:
 {chunks_text}
 
-Return ONLY a JSON array of chunk numbers from the ones shown above.
-Choose chunks that best answer the query with minimum redundancy.
+Choose the {final_max} MOST important ones.
 
 Your response:"""
\ No newline at end of file
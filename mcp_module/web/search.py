@@ -3,6 +3,8 @@ import os
 from typing import Dict, Any
 from async_lru import alru_cache
 
+from .http_session import get_session
+
 # ========== 工具配置 ==========
 SEARCH_TOOL_CONFIG = {
     'name': 'search',
@@ -53,22 +55,22 @@ async def _search_google(query: str, params: dict) -> list:
         return [{'error': 'Google API key not provided'}]
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                    'https://google.serper.dev/search',
-                    headers={'X-API-KEY': api_key},
-                    json={'q': query, 'num': params['max_results']},
-                    timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                data = await resp.json()
-                return [
-                    {
-                        'title': r.get('title', ''),
-                        'url': r.get('link', ''),
-                        'snippet': r.get('snippet', '')
-                    }
-                    for r in data.get('organic', [])[:params['max_results']]
-                ]
+        session = await get_session()
+        async with session.post(
+                'https://google.serper.dev/search',
+                headers={'X-API-KEY': api_key},
+                json={'q': query, 'num': params['max_results']},
+                timeout=aiohttp.ClientTimeout(total=30)
+        ) as resp:
+            data = await resp.json()
+            return [
+                {
+                    'title': r.get('title', ''),
+                    'url': r.get('link', ''),
+                    'snippet': r.get('snippet', '')
+                }
+                for r in data.get('organic', [])[:params['max_results']]
+            ]
     except Exception as e:
         return [{'error': f'Google search error: {e}'}]
 
@@ -80,26 +82,26 @@ async def _search_tavily(query: str, params: dict) -> list:
         return [{'error': 'Tavily API key not provided'}]
 
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.post(
-                    'https://api.tavily.com/search',
-                    json={
-                        'api_key': api_key,
-                        'query': query,
-                        'search_depth': 'advanced',
-                        'max_results': params['max_results']
-                    },
-                    timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                data = await resp.json()
-                return [
-                    {
-                        'title': r.get('title', ''),
-                        'url': r.get('url', ''),
-                        'snippet': r.get('content', '')
-                    }
-                    for r in data.get('results', [])
-                ]
+        session = await get_session()
+        async with session.post(
+                'https://api.tavily.com/search',
+                json={
+                    'api_key': api_key,
+                    'query': query,
+                    'search_depth': 'advanced',
+                    'max_results': params['max_results']
+                },
+                timeout=aiohttp.ClientTimeout(total=30)
+        ) as resp:
+            data = await resp.json()
+            return [
+                {
+                    'title': r.get('title', ''),
+                    'url': r.get('url', ''),
+                    'snippet': r.get('content', '')
+                }
+                for r in data.get('results', [])
+            ]
     except Exception as e:
         return [{'error': f'Tavily search error: {e}'}]
 
@@ -107,21 +109,21 @@ async def _search_tavily(query: str, params: dict) -> list:
 async def _search_searxng(query: str, params: dict) -> list:
     """SearxNG instance"""
     try:
-        async with aiohttp.ClientSession() as session:
-            async with session.get(
-                    f"{params['searxng_url']}/search",
-                    params={'q': query, 'format': 'json'},
-                    timeout=aiohttp.ClientTimeout(total=30)
-            ) as resp:
-                data = await resp.json()
-                return [
-                    {
-                        'title': r.get('title', ''),
-                        'url': r.get('url', ''),
-                        'snippet': r.get('content', '')
-                    }
-                    for r in data.get('results', [])[:params['max_results']]
-                ]
+        session = await get_session()
+        async with session.get(
+                f"{params['searxng_url']}/search",
+                params={'q': query, 'format': 'json'},
+                timeout=aiohttp.ClientTimeout(total=30)
+        ) as resp:
+            data = await resp.json()
+            return [
+                {
+                    'title': r.get('title', ''),
+                    'url': r.get('url', ''),
+                    'snippet': r.get('content', '')
+                }
+                for r in data.get('results', [])[:params['max_results']]
+            ]
     except Exception as e:
         return [{'error': f'SearxNG search error: {e}'}]
 
@@ -0,0 +1,32 @@
+from typing import List
+
+# 切分点优先级: 段落 > 换行 > 空格, 都找不到时硬切
+SEPARATORS = ("\n\n", "\n", " ")
+
+
+def split_text(text: str, chunk_size: int, seps=SEPARATORS) -> List[str]:
+    """单遍切分文本, 每块不超过 chunk_size 个字符
+
+    在 [pos + chunk_size // 2, pos + chunk_size] 窗口内用 str.rfind 从后往前找优先级最高的分隔符,
+    都找不到时硬切; 只对原文切片一次, 块首尾空白会被去掉, 空块丢弃。
+    """
+    if chunk_size <= 0:
+        raise ValueError(f"chunk_size must be positive, got {chunk_size}")
+    chunks = []
+    pos, n = 0, len(text)
+    while pos < n:
+        end = pos + chunk_size
+        if end >= n:
+            cut = n
+        else:
+            cut = end
+            for sep in seps:
+                found = text.rfind(sep, pos + chunk_size // 2, end)
+                if found != -1:
+                    cut = found
+                    break
+        chunk = text[pos:cut].strip()
+        if chunk:
+            chunks.append(chunk)
+        pos = cut if cut > pos else end
+    return chunks
@@ -2,6 +2,7 @@
 """Browser MCP Server - Complete Implementation with Closure Pattern"""
 import contextlib
 import logging
+import os
 from collections.abc import AsyncIterator
 from typing import Dict, List, Any, Callable, Optional
 import uvicorn
@@ -12,7 +13,7 @@ from starlette.applications import Starlette
 from starlette.routing import Mount
 from starlette.types import Receive, Scope, Send
 
-from browser import BrowserManager, create_browser_tools
+from browser import BrowserManager, Progress, create_browser_tools
 
 logger = logging.getLogger(__name__)
 
@@ -61,7 +62,10 @@ class GenericMCPServer:
 
             # Get context and call handler
             ctx = self.server.request_context
-            result = await tool['handler'](ctx, arguments)
+            if tool.get('streaming'):
+                result = await self._drain_stream(ctx, tool['handler'](ctx, arguments))
+            else:
+                result = await tool['handler'](ctx, arguments)
 
             # Wrap result as ContentBlock
             if isinstance(result, str):
@@ -71,6 +75,22 @@ class GenericMCPServer:
             else:
                 return [TextContent(type="text", text=str(result))]
 
+    @staticmethod
+    async def _drain_stream(ctx, stream: AsyncIterator[Any]) -> Any:
+        """Consume a streaming handler: Progress items go out as notifications as soon as they are yielded,
+        the last non-Progress item is the result"""
+        progress_token = ctx.meta.progressToken if ctx.meta else None
+        result = None
+        step = 0
+        async for item in stream:
+            if isinstance(item, Progress):
+                step += 1
+                if progress_token is not None:
+                    await ctx.session.send_progress_notification(progress_token, step, message=str(dict(item)))
+            else:
+                result = item
+        return result
+
     def register_tools(self, tools: List[Dict[str, Any]]):
         """Register tool configurations"""
         self._tools.extend(tools)
@@ -125,7 +145,12 @@ def main():
     )
 
     # Create browser manager
-    browser_manager = BrowserManager(max_sessions=32, headless=True)
+    browser_manager = BrowserManager(
+        max_sessions=32,
+        headless=True,
+        http_cache_dir=os.getenv('BROWSER_HTTP_CACHE_DIR'),  # Unset disables response caching
+        shared_context=os.getenv('BROWSER_SHARED_CONTEXT') == '1'  # Trades session isolation for memory
+    )
 
     # Create server with lifecycle functions
     server = GenericMCPServer(
@@ -3,8 +3,10 @@
 import asyncio
 import contextlib
 import logging
+import os
 from collections.abc import AsyncIterator
-from typing import List, Dict, Any, Optional
+from dataclasses import dataclass, field
+from typing import List, Dict, Any, Optional, Callable, Awaitable, Union
 
 import uvicorn
 from mcp.server.lowlevel import Server
@@ -19,11 +21,38 @@ from mcp_module.web.search import get_tool_config as get_search_config
 from mcp_module.web.local_search import get_tool_config as get_local_search_config
 from mcp_module.web.fetch import (
     get_fetch_chunked_config,
-    get_fetch_summary_config
+    get_fetch_summary_config,
+    get_fetch_batch_config,
+    close_browser,
+    close_openai_clients
 )
+from mcp_module.web.http_session import close_session
 
 logger = logging.getLogger(__name__)
 
+# 优先使用 uvloop + httptools (C 实现)，缺失时 (如 Windows) 回退到 uvicorn 默认实现
+try:
+    import uvloop  # noqa: F401
+    _UVICORN_LOOP = "uvloop"
+except ImportError:
+    _UVICORN_LOOP = "auto"
+
+try:
+    import httptools  # noqa: F401
+    _UVICORN_HTTP = "httptools"
+except ImportError:
+    _UVICORN_HTTP = "auto"
+
+
+@dataclass(slots=True)
+class ToolConfig:
+    """工具配置 (slots 属性访问, 替代 dict 查找)"""
+    name: str
+    description: str
+    schema: Dict[str, Any]
+    func: Callable[..., Awaitable[Any]]
+    hidden_params: Dict[str, Any] = field(default_factory=dict)
+
 
 class NativeMCPServer:
     """原生 MCP 服务器 - 完全控制 schema"""
@@ -42,7 +71,9 @@ class NativeMCPServer:
 
         # 创建 MCP Server
         self.server = Server(name)
-        self._tools_config: List[Dict[str, Any]] = []
+        self._tools_config: List[ToolConfig] = []
+        self._tools_by_name: Dict[str, ToolConfig] = {}
+        self._tools_list: List[Tool] = []
 
         # 设置处理器
         self._setup_handlers()
@@ -53,41 +84,30 @@ class NativeMCPServer:
         @self.server.list_tools()
         async def list_tools() -> List[Tool]:
             """列出所有工具"""
-            tools = []
-            for config in self._tools_config:
-                tools.append(Tool(
-                    name=config['name'],
-                    description=config['description'],
-                    inputSchema=config['schema']
-                ))
-            return tools
+            return self._tools_list
 
         @self.server.call_tool()
         async def call_tool(name: str, arguments: dict) -> List[ContentBlock]:
             """调用工具"""
-            # 查找工具配置
-            config = next(
-                (c for c in self._tools_config if c['name'] == name),
-                None
-            )
+            # 查找工具配置 (按名称索引, O(1))
+            config = self._tools_by_name.get(name)
             if not config:
                 raise ValueError(f"Unknown tool: {name}")
 
-            # 合并隐藏参数
-            func = config['func']
-            hidden_params = config.get('hidden_params', {})
-            full_args = {**hidden_params, **arguments}
-            # 调用异步函数
-            result = await func(**full_args)
-            print(result)
+            # 合并隐藏参数并调用异步函数
+            full_args = {**config.hidden_params, **arguments}
+            result = await config.func(**full_args)
+            text = str(result)
+            if logger.isEnabledFor(logging.DEBUG):
+                logger.debug("tool %s -> %d chars", name, len(text))
 
-            return [TextContent(type="text", text=str(result))]
+            return [TextContent(type="text", text=text)]
 
-    def register_tools(self, tools_config: List[Dict[str, Any]]):
+    def register_tools(self, tools_config: List[Union[ToolConfig, Dict[str, Any]]]):
         """注册工具配置
 
         Args:
-            tools_config: [{
+            tools_config: ToolConfig 或等价的 dict 列表 [{
                 'func': 异步函数对象,
                 'name': 工具名称,
                 'description': 描述,
@@ -95,7 +115,13 @@ class NativeMCPServer:
                 'hidden_params': 隐藏参数的默认值 dict
             }]
         """
-        self._tools_config = tools_config
+        self._tools_config = [c if isinstance(c, ToolConfig) else ToolConfig(**c) for c in tools_config]
+        # 注册时预先建立索引和 Tool 列表, 避免每次调用重复构建
+        self._tools_by_name = {c.name: c for c in self._tools_config}
+        self._tools_list = [
+            Tool(name=c.name, description=c.description, inputSchema=c.schema)
+            for c in self._tools_config
+        ]
         logger.info(f"注册了 {len(tools_config)} 个工具")
 
     def create_app(self) -> Starlette:
@@ -123,6 +149,10 @@ class NativeMCPServer:
                     yield
                 finally:
                     logger.info("👋 服务器关闭中...")
+                    # 关闭 fetch 工具共享的浏览器、LLM 客户端和搜索工具共享的 HTTP 会话
+                    await close_browser()
+                    await close_openai_clients()
+                    await close_session()
 
         # 创建 Starlette 应用
         app = Starlette(
@@ -135,26 +165,41 @@ class NativeMCPServer:
 
         return app
 
-    def run(self):
-        """运行服务器"""
+    def run(self, workers: int = 1, app_factory: Optional[str] = None):
+        """运行服务器
+
+        Args:
+            workers: uvicorn 工作进程数, >1 时利用多核 (仅适用于 stateless 模式)
+            app_factory: 多进程时每个 worker 用于重建应用的工厂导入路径, 如 "mcp_server_web:make_app"
+        """
+        if workers > 1:
+            if not app_factory:
+                raise ValueError("workers > 1 需要提供 app_factory")
+            uvicorn.run(
+                app_factory,
+                factory=True,
+                host="0.0.0.0",
+                port=self.port,
+                workers=workers,
+                log_level="info",
+                loop=_UVICORN_LOOP,
+                http=_UVICORN_HTTP
+            )
+            return
+
         app = self.create_app()
         uvicorn.run(
             app,
             host="0.0.0.0",
             port=self.port,
-            log_level="info"
+            log_level="info",
+            loop=_UVICORN_LOOP,
+            http=_UVICORN_HTTP
         )
 
 
-# ========== 使用示例 ==========
-if __name__ == "__main__":
-    # 配置日志
-    logging.basicConfig(
-        level=logging.INFO,
-        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
-    )
-
-    # 创建服务器
+def build_server() -> NativeMCPServer:
+    """创建并注册工具的搜索服务器"""
     server = NativeMCPServer(
         name="search-service",
         port=8001,
@@ -166,9 +211,31 @@ if __name__ == "__main__":
     server.register_tools([
         # get_local_search_config()
         get_search_config(),
+        get_fetch_batch_config(),
         # get_fetch_summary_config(),
         # get_fetch_summary_config()
     ])
+    return server
+
+
+def make_app() -> Starlette:
+    """uvicorn 多进程工厂: 每个 worker 进程独立构建应用"""
+    return build_server().create_app()
+
+
+# ========== 使用示例 ==========
+if __name__ == "__main__":
+    # 配置日志
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+    )
+
+    # 创建服务器
+    server = build_server()
 
-    # 运行服务器
-    server.run()
\ No newline at end of file
+    # 运行服务器 (MCP_WORKERS > 1 时启用多进程)
+    server.run(
+        workers=int(os.getenv("MCP_WORKERS", "1")),
+        app_factory="mcp_server_web:make_app"
+    )
@@ -1,231 +1,385 @@
 #!/usr/bin/env python3
 """Force download test script for embedded content like PDFs and images"""
 import asyncio
+import base64
+import contextlib
+import json
+import logging
+import logging.handlers
+import mimetypes
+import queue
+import re
 from pathlib import Path
+from urllib.parse import urlparse, unquote
 from playwright.async_api import async_playwright
 import aiohttp
-import aiofiles
+
+log = logging.getLogger('downloader')
+
+# 流式下载时单次读取的块大小 (同时作为 aiohttp 内部读缓冲上限) 和单次写盘的块大小
+_READ_CHUNK = 64 * 1024
+_WRITE_BLOCK = 1 << 20
+
+# 下载目录在导入时创建一次, 各下载函数不再逐文件 mkdir
+DOWNLOAD_DIR = Path("./downloads")
+DOWNLOAD_DIR.mkdir(exist_ok=True)
+
+# 条件请求缓存: url -> {etag, last_modified, size, content_type, path}, 持久化在下载目录
+_CACHE_FILE = DOWNLOAD_DIR / ".cache.json"
+_download_cache = None
+_cache_lock = asyncio.Lock()
+
+# 匹配 filename="xxx" 或 filename*=UTF-8''xxx
+_FILENAME_RE = re.compile(r'filename[*]?=["\']?([^;"\']+)')
+
+# 其余类型交给标准库 mimetypes; 这里只覆盖其结果因平台而异或不理想的类型
+mimetypes.init()
+_MIME_OVERRIDES = {
+    'image/jpeg': '.jpg',  # 部分平台返回 .jpe
+    'text/plain': '.txt',
+    'application/xml': '.xml',  # 标准库返回 .xsl
+}
 
 
 def extract_filename_from_headers(headers):
     """从HTTP headers中提取文件名"""
     content_disposition = headers.get('content-disposition', '')
     if content_disposition:
-        import re
-        # 尝试匹配 filename="xxx" 或 filename*=UTF-8''xxx
-        filename_match = re.search(r'filename[*]?=["\']?([^;"\']+)', content_disposition)
+        filename_match = _FILENAME_RE.search(content_disposition)
         if filename_match:
-            filename = filename_match.group(1)
             # 处理URL编码的文件名
-            from urllib.parse import unquote
-            return unquote(filename)
+            return unquote(filename_match.group(1))
     return None
 
 
 def get_extension_from_content_type(content_type):
     """根据content-type获取文件扩展名"""
-    mime_map = {
-        'application/pdf': '.pdf',
-        'image/jpeg': '.jpg',
-        'image/png': '.png',
-        'image/gif': '.gif',
-        'text/html': '.html',
-        'text/plain': '.txt',
-        'application/zip': '.zip',
-        'application/json': '.json',
-        'application/xml': '.xml',
-    }
-    if content_type:
-        # 移除参数部分 (如 "; charset=utf-8")
-        base_type = content_type.split(';')[0].strip()
-        return mime_map.get(base_type, '')
-    return ''
-
-
-async def download_with_aiohttp(url: str, filepath: Path = None):
-    """使用 aiohttp 直接下载文件"""
-    async with aiohttp.ClientSession() as session:
-        async with session.get(url) as response:
-            response.raise_for_status()
-
-            # 如果没有提供filepath，尝试自动获取文件名
-            if filepath is None:
-                filename = extract_filename_from_headers(response.headers)
-                if not filename:
-                    # 从URL获取文件名
-                    from urllib.parse import urlparse, unquote
-                    parsed_url = urlparse(url)
-                    filename = unquote(parsed_url.path.split('/')[-1])
-
-                    # 如果还是没有文件名或只是路径，使用默认名称
-                    if not filename or filename.endswith('/'):
-                        filename = 'download'
-                        # 添加扩展名
-                        ext = get_extension_from_content_type(response.headers.get('content-type'))
-                        if ext and not filename.endswith(ext):
-                            filename += ext
-
-                download_dir = Path("./downloads")
-                download_dir.mkdir(exist_ok=True)
-                filepath = download_dir / filename
-
-            content = await response.read()
-            async with aiofiles.open(filepath, 'wb') as f:
-                await f.write(content)
-            return len(content), response.headers.get('content-type', 'unknown'), filepath
-
-
-async def force_download(url: str, filename: str = None):
-    """强制下载内嵌显示的内容"""
-    download_dir = Path("./downloads")
-    download_dir.mkdir(exist_ok=True)
+    # 移除参数部分 (如 "; charset=utf-8")
+    base_type = (content_type or '').split(';', 1)[0].strip().lower()
+    if not base_type:
+        return ''
+    return _MIME_OVERRIDES.get(base_type) or mimetypes.guess_extension(base_type) or ''
+
+
+def create_http_session() -> aiohttp.ClientSession:
+    """创建共享的 aiohttp 会话 (连接池 + keep-alive + DNS 缓存)
+
+    read_bufsize 限制每个响应的内部缓冲, 配合连接数上限, 并发下载的内存占用与文件总大小无关。
+    """
+    return aiohttp.ClientSession(connector=aiohttp.TCPConnector(
+        limit=32, limit_per_host=8, keepalive_timeout=75, ttl_dns_cache=300), read_bufsize=_READ_CHUNK)
+
+
+async def preconnect(session: aiohttp.ClientSession, urls):
+    """对每个主机发一次 HEAD, 提前完成 DNS + TCP + TLS 握手, 连接留在池中供后续 GET 复用
+
+    仅为预热, 响应内容和错误都忽略。
+    """
+    async def head(origin):
+        async with session.head(origin, allow_redirects=True):
+            pass
+
+    origins = {f"{p.scheme}://{p.netloc}/" for p in map(urlparse, urls)}
+    await asyncio.gather(*(head(o) for o in origins), return_exceptions=True)
+
+
+class BrowserPool:
+    """浏览器池: 懒启动单个 Chromium 实例, 每次下载分配一个新的独立 BrowserContext"""
+
+    def __init__(self, headless: bool = True):
+        self.headless = headless
+        self._playwright = None
+        self._browser = None
+        self._launch_lock = asyncio.Lock()
+        self._idle = []  # warm_up 预建、尚未使用的上下文
+
+    async def _get_browser(self):
+        """首次使用时启动浏览器"""
+        async with self._launch_lock:
+            if self._browser is None:
+                self._playwright = await async_playwright().start()
+                self._browser = await self._playwright.chromium.launch(headless=self.headless)
+        return self._browser
+
+    async def _new_context(self):
+        """创建带下载处理的上下文"""
+        browser = await self._get_browser()
+        return await browser.new_context(
+            accept_downloads=True,
+            viewport={'width': 1280, 'height': 720}
+        )
+
+    async def warm_up(self, count: int = 1):
+        """预先启动浏览器并建好 count 个上下文"""
+        contexts = await asyncio.gather(*(self._new_context() for _ in range(count)))
+        self._idle.extend(contexts)
+
+    @contextlib.asynccontextmanager
+    async def acquire(self):
+        """分配一个上下文, 用完即关闭, 保证下载之间互相隔离"""
+        context = self._idle.pop() if self._idle else await self._new_context()
+        try:
+            yield context
+        finally:
+            await context.close()
+
+    async def close(self):
+        """关闭预建上下文、浏览器和 Playwright"""
+        while self._idle:
+            await self._idle.pop().close()
+        if self._browser:
+            await self._browser.close()
+            self._browser = None
+        if self._playwright:
+            await self._playwright.stop()
+            self._playwright = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        await self.close()
+
+
+def _load_download_cache() -> dict:
+    """首次使用时读取条件请求缓存"""
+    global _download_cache
+    if _download_cache is None:
+        try:
+            _download_cache = json.loads(_CACHE_FILE.read_text())
+        except (OSError, ValueError):
+            _download_cache = {}
+    return _download_cache
+
+
+async def _save_download_cache():
+    """整体写回缓存文件 (加锁, 避免并发下载交错写入); 缓存只是优化, 写失败时忽略"""
+    async with _cache_lock:
+        data = json.dumps(_download_cache, ensure_ascii=False)
+        try:
+            await asyncio.to_thread(_CACHE_FILE.write_text, data)
+        except OSError as e:
+            log.warning("缓存写入失败: %s", e)
+
+
+async def download_with_aiohttp(url: str, filepath: Path = None, session: aiohttp.ClientSession = None,
+                                download_dir: Path = DOWNLOAD_DIR):
+    """使用 aiohttp 直接下载文件 (传入 session 时复用其连接池)
+
+    本地已有文件且缓存了 ETag / Last-Modified 时发送条件请求, 304 则直接复用本地文件。
+    """
+    if session is None:
+        async with create_http_session() as session:
+            return await download_with_aiohttp(url, filepath, session, download_dir)
+
+    cache = _load_download_cache()
+    entry = cache.get(url)
+    if entry and (filepath is None or Path(entry['path']) == filepath) and Path(entry['path']).exists():
+        headers = {}
+        if entry.get('etag'):
+            headers['If-None-Match'] = entry['etag']
+        if entry.get('last_modified'):
+            headers['If-Modified-Since'] = entry['last_modified']
+    else:
+        entry, headers = None, {}
 
+    async with session.get(url, headers=headers, read_bufsize=_READ_CHUNK) as response:
+        if entry and response.status == 304:
+            return entry['size'], entry['content_type'], Path(entry['path'])
+        response.raise_for_status()
+
+        # 如果没有提供filepath，尝试自动获取文件名
+        if filepath is None:
+            filename = extract_filename_from_headers(response.headers)
+            if not filename:
+                # 从URL获取文件名
+                parsed_url = urlparse(url)
+                filename = unquote(parsed_url.path.split('/')[-1])
+
+                # 如果还是没有文件名或只是路径，使用默认名称
+                if not filename or filename.endswith('/'):
+                    filename = 'download'
+                    # 添加扩展名
+                    ext = get_extension_from_content_type(response.headers.get('content-type'))
+                    if ext and not filename.endswith(ext):
+                        filename += ext
+
+            filepath = download_dir / filename
+
+        # 分块流式写盘, 内存占用与文件大小无关; 每攒满 1 MiB 才切一次线程写入
+        size = 0
+        pending = bytearray()
+        f = await asyncio.to_thread(open, filepath, 'wb')
+        try:
+            async for chunk in response.content.iter_chunked(_READ_CHUNK):
+                pending += chunk
+                size += len(chunk)
+                if len(pending) >= _WRITE_BLOCK:
+                    await asyncio.to_thread(f.write, pending)
+                    pending.clear()
+            if pending:
+                await asyncio.to_thread(f.write, pending)
+        finally:
+            await asyncio.to_thread(f.close)
+
+        content_type = response.headers.get('content-type', 'unknown')
+        etag, last_modified = response.headers.get('etag'), response.headers.get('last-modified')
+        if etag or last_modified:
+            cache[url] = {'etag': etag, 'last_modified': last_modified, 'size': size,
+                          'content_type': content_type, 'path': str(filepath)}
+            await _save_download_cache()
+        elif cache.pop(url, None):
+            await _save_download_cache()
+        return size, content_type, filepath
+
+
+async def force_download(url: str, filename: str = None, session: aiohttp.ClientSession = None,
+                         pool: BrowserPool = None, context=None, download_dir: Path = DOWNLOAD_DIR):
+    """强制下载内嵌显示的内容"""
     # 首先尝试使用 aiohttp 直接下载
     try:
-        print(f"正在下载 (直接HTTP): {url}")
+        log.info("正在下载 (直接HTTP): %s", url)
         size, content_type, filepath = await download_with_aiohttp(url,
-                                                                   None if not filename else download_dir / filename)
-        print(f"✓ 下载成功: {filepath}")
-        print(f"  文件大小: {size} bytes")
-        print(f"  内容类型: {content_type}")
+                                                                   None if not filename else download_dir / filename,
+                                                                   session, download_dir)
+        log.info("✓ 下载成功: %s\n  文件大小: %d bytes\n  内容类型: %s", filepath, size, content_type)
         return True
     except Exception as e:
-        print(f"直接下载失败: {e}")
-        print("尝试使用浏览器下载...")
+        log.info("直接下载失败: %s\n尝试使用浏览器下载...", e)
 
     # 如果没有提供filename，从URL提取
     if not filename:
-        from urllib.parse import urlparse, unquote
         parsed_url = urlparse(url)
         filename = unquote(parsed_url.path.split('/')[-1]) or 'download'
 
     filepath = download_dir / filename
 
-    # 如果直接下载失败，使用 Playwright
-    async with async_playwright() as p:
-        # 配置浏览器以禁用 PDF 查看器
-        browser = await p.chromium.launch(
-            headless=True,
-            args=['--disable-features=ChromePdfRenderer']
-        )
+    # 如果直接下载失败，使用 Playwright: 优先用传入的共享 context, 否则从 pool 分配
+    # (未传入 pool 时临时创建一个)
+    if context is not None:
+        return await _browser_download(url, filepath, context)
+    if pool is None:
+        async with BrowserPool() as pool, pool.acquire() as context:
+            return await _browser_download(url, filepath, context)
+    async with pool.acquire() as context:
+        return await _browser_download(url, filepath, context)
 
-        # 创建带下载处理的上下文
-        context = await browser.new_context(
-            accept_downloads=True,
-            viewport={'width': 1280, 'height': 720}
-        )
 
-        page = await context.new_page()
+async def _browser_download(url: str, filepath: Path, context):
+    """在给定 context 的新页面中依次尝试浏览器下载方式, 结束后关闭页面"""
+    page = await context.new_page()
 
-        try:
-            # 对于 PDF，使用特殊处理
-            download_promise = None
-            if url.endswith('.pdf'):
-                try:
-                    # 监听下载事件
-                    download_promise = asyncio.create_task(wait_for_download(page))
-
-                    # 注入脚本强制下载 PDF
-                    await page.goto('about:blank')
-                    await page.evaluate('''
-                        (url) => {
-                            const link = document.createElement('a');
-                            link.href = url;
-                            link.download = url.split('/').pop();
-                            link.target = '_blank';
-                            document.body.appendChild(link);
-                            link.click();
-                        }
-                    ''', url)
-
-                    # 等待下载
-                    download = await asyncio.wait_for(download_promise, timeout=10)
-                    await download.save_as(filepath)
-                    print(f"✓ 下载成功 (通过浏览器): {filepath}")
-                    return True
-                except asyncio.TimeoutError:
-                    print("下载超时，尝试其他方法...")
-                finally:
-                    # 取消未完成的任务
-                    if download_promise and not download_promise.done():
-                        download_promise.cancel()
-                        try:
-                            await download_promise
-                        except asyncio.CancelledError:
-                            pass
-
-            # 对于非 PDF 文件或 PDF 下载失败的情况
+    try:
+        # 对于 PDF，拦截响应并改为 attachment, 触发浏览器原生下载
+        if url.endswith('.pdf'):
+            async def force_attachment(route):
+                response = await route.fetch()
+                headers = {**response.headers,
+                           'content-disposition': f'attachment; filename="{filepath.name}"'}
+                await route.fulfill(response=response, headers=headers)
+
+            await page.route(url, force_attachment)
             try:
-                # 使用页面评估下载
-                await page.goto('about:blank')
-                result = await page.evaluate('''
-                    async (url) => {
-                        try {
-                            const response = await fetch(url);
-                            const blob = await response.blob();
-                            const buffer = await blob.arrayBuffer();
-                            return {
-                                success: true,
-                                data: Array.from(new Uint8Array(buffer)),
-                                type: blob.type,
-                                size: blob.size
-                            };
-                        } catch (error) {
-                            return {
-                                success: false,
-                                error: error.message
-                            };
-                        }
+                async with page.expect_download(timeout=10000) as download_info:
+                    try:
+                        await page.goto(url)
+                    except Exception as e:
+                        # 响应变成下载时导航会中止, 属于预期
+                        if "Download is starting" not in str(e) and "net::ERR_ABORTED" not in str(e):
+                            raise
+                download = await download_info.value
+                await download.save_as(filepath)
+                log.info("✓ 下载成功 (通过浏览器): %s", filepath)
+                return True
+            except Exception as e:
+                log.info("浏览器原生下载失败: %s, 尝试其他方法...", e)
+            finally:
+                await page.unroute(url, force_attachment)
+
+        # 对于非 PDF 文件或 PDF 下载失败的情况
+        try:
+            # 使用页面评估下载
+            await page.goto('about:blank')
+            result = await page.evaluate('''
+                async (url) => {
+                    try {
+                        const response = await fetch(url);
+                        const blob = await response.blob();
+                        // 以 base64 返回, 避免逐字节的 JSON 数组
+                        const dataUrl = await new Promise((resolve, reject) => {
+                            const reader = new FileReader();
+                            reader.onload = () => resolve(reader.result);
+                            reader.onerror = () => reject(reader.error);
+                            reader.readAsDataURL(blob);
+                        });
+                        return {
+                            success: true,
+                            data: dataUrl.slice(dataUrl.indexOf(',') + 1),
+                            type: blob.type,
+                            size: blob.size
+                        };
+                    } catch (error) {
+                        return {
+                            success: false,
+                            error: error.message
+                        };
                     }
-                ''', url)
+                }
+            ''', url)
 
-                if result["success"]:
-                    filepath.write_bytes(bytes(result["data"]))
-                    print(f"✓ 下载成功 (Fetch API): {filepath}")
-                    print(f"  文件大小: {result['size']} bytes")
-                    print(f"  内容类型: {result['type']}")
-                    return True
-                else:
-                    print(f"✗ Fetch API 失败: {result['error']}")
+            if result["success"]:
+                filepath.write_bytes(base64.b64decode(result["data"]))
+                log.info("✓ 下载成功 (Fetch API): %s\n  文件大小: %d bytes\n  内容类型: %s",
+                         filepath, result['size'], result['type'])
+                return True
+            else:
+                log.info("✗ Fetch API 失败: %s", result['error'])
 
-            except Exception as e:
-                print(f"浏览器下载失败: {e}")
+        except Exception as e:
+            log.info("浏览器下载失败: %s", e)
 
-            # 最后的尝试：使用页面导航
-            try:
-                response = await page.goto(url, wait_until="networkidle")
-                if response:
-                    body = await response.body()
-                    filepath.write_bytes(body)
-                    print(f"✓ 下载成功 (页面导航): {filepath}")
-                    print(f"  文件大小: {len(body)} bytes")
-                    return True
-            except Exception as nav_error:
-                print(f"页面导航失败: {nav_error}")
+        # 最后的尝试：使用页面导航
+        try:
+            # commit 在收到响应头时即返回, body() 会自行等待响应体传输完成
+            response = await page.goto(url, wait_until="commit")
+            if response:
+                body = await response.body()
+                await asyncio.to_thread(filepath.write_bytes, body)
+                log.info("✓ 下载成功 (页面导航): %s\n  文件大小: %d bytes", filepath, len(body))
+                return True
+        except Exception as nav_error:
+            log.info("页面导航失败: %s", nav_error)
 
-        except Exception as e:
-            print(f"✗ 浏览器错误: {e}")
-            return False
-        finally:
-            await context.close()
-            await browser.close()
+    except Exception as e:
+        log.error("✗ 浏览器错误: %s", e)
+        return False
+    finally:
+        await page.close()
 
-    print(f"✗ 所有下载方法都失败了")
+    log.error("✗ 所有下载方法都失败了")
     return False
 
 
-async def wait_for_download(page):
-    """等待下载事件"""
-    async with page.expect_download() as download_info:
-        download = await download_info.value
-        return download
+_requests_session = None
+
+
+def get_requests_session():
+    """延迟创建共享的 requests.Session, 保持 keep-alive 连接池"""
+    global _requests_session
+    if _requests_session is None:
+        import requests
+        from requests.adapters import HTTPAdapter
+        _requests_session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=8, pool_maxsize=32)
+        _requests_session.mount('http://', adapter)
+        _requests_session.mount('https://', adapter)
+    return _requests_session
 
 
 async def download_with_requests_fallback(url: str, filepath: Path):
     """使用 requests 作为最后的备选方案"""
-    import requests
     try:
-        response = requests.get(url, headers={
+        response = get_requests_session().get(url, headers={
             'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36'
         })
         response.raise_for_status()
@@ -251,50 +405,75 @@ async def test_downloads():
         ("https://www.example.com", "example.html"),
     ]
 
-    # 测试自动文件名识别
-    print("=== 测试自动文件名识别 ===")
+    # 测试自动文件名识别 (不提供filename) 和手动指定文件名
+    log.info("=== 下载测试 (自动识别与手动指定文件名, 并发执行) ===")
     auto_urls = [
         "https://arxiv.org/pdf/1706.03762",  # 应该识别为 1706.03762.pdf
         "https://httpbin.org/image/png",  # 应该根据content-type识别为 .png
         "https://www.example.com/",  # 应该使用 download.html
     ]
 
-    for url in auto_urls:
-        print(f"\n--- 自动识别文件名: {url} ---")
-        await force_download(url)  # 不提供filename参数
-        await asyncio.sleep(1)
-
-    print("\n\n=== 手动指定文件名测试 ===")
-    for url, filename in test_urls:
-        print(f"\n--- 测试: {filename} ---")
-        await force_download(url, filename)
-        await asyncio.sleep(1)
-
-    print("\n\n=== 下载结果汇总 ===")
-    download_dir = Path("./downloads")
-    if download_dir.exists():
-        files = list(download_dir.glob("*"))
+    # 所有下载共享一个会话 (同主机的请求复用连接)
+    # 浏览器回退全部在同一个 context 里各开一个页面, 只付一次 context 创建的开销
+    async with create_http_session() as session, BrowserPool() as pool, pool.acquire() as context:
+        # 并发下载, 信号量限制同时进行的任务数 (连接器的 limit_per_host 另行限制单主机并发)
+        sem = asyncio.Semaphore(8)
+
+        # 批量下载前先预热各主机的连接
+        await preconnect(session, [*auto_urls, *(url for url, _ in test_urls)])
+
+        async def download_one(url, filename=None):
+            async with sem:
+                log.info("\n--- %s ---", '测试: ' + filename if filename else '自动识别文件名: ' + url)
+                await force_download(url, filename, session, context=context)
+
+        await asyncio.gather(
+            *(download_one(url) for url in auto_urls),  # 不提供filename参数
+            *(download_one(url, filename) for url, filename in test_urls)
+        )
+
+    log.info("\n\n=== 下载结果汇总 ===")
+    if DOWNLOAD_DIR.exists():
+        files = list(DOWNLOAD_DIR.glob("*"))
         if files:
-            print(f"成功下载 {len(files)} 个文件:")
-            for f in sorted(files):
-                print(f"  - {f.name} ({f.stat().st_size} bytes)")
+            # 汇总一次性拼好再输出, 不逐行写
+            lines = [f"成功下载 {len(files)} 个文件:"]
+            lines += [f"  - {f.name} ({f.stat().st_size} bytes)" for f in sorted(files)]
+            log.info("\n".join(lines))
         else:
-            print("没有成功下载任何文件")
+            log.info("没有成功下载任何文件")
     else:
-        print("下载目录不存在")
+        log.info("下载目录不存在")
+
+
+def setup_logging() -> logging.handlers.QueueListener:
+    """日志经 QueueHandler 入队, 由 QueueListener 的后台线程写 stderr, 事件循环里不做同步 I/O
+
+    返回已启动的 listener, 退出前需调用 stop() 以刷新剩余日志。
+    """
+    log_queue = queue.SimpleQueue()
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter('%(message)s'))
+    listener = logging.handlers.QueueListener(log_queue, handler)
+    logging.basicConfig(handlers=[logging.handlers.QueueHandler(log_queue)], level=logging.INFO)
+    listener.start()
+    return listener
 
 
 if __name__ == "__main__":
-    print("强制下载测试开始...\n")
+    listener = setup_logging()
+    log.info("强制下载测试开始...\n")
 
     # 确保安装了必要的库
     try:
         import aiohttp
-        import aiofiles
     except ImportError:
-        print("请先安装必要的库:")
-        print("pip install playwright aiohttp aiofiles requests")
+        log.error("请先安装必要的库:\npip install playwright aiohttp requests")
+        listener.stop()
         exit(1)
 
-    asyncio.run(test_downloads())
-    print("\n测试完成！检查 ./downloads 目录")
\ No newline at end of file
+    try:
+        asyncio.run(test_downloads())
+        log.info("\n测试完成！检查 ./downloads 目录")
+    finally:
+        listener.stop()
\ No newline at end of file
@@ -0,0 +1,62 @@
+import asyncio
+import importlib.util
+import unittest
+from types import SimpleNamespace
+
+_DEPS = ("playwright", "aiohttp", "aiofiles")
+_HAVE_DEPS = all(importlib.util.find_spec(name) for name in _DEPS)
+
+
+class FakePage:
+    """Just enough of a Playwright page for BrowserManager._run_until_settled"""
+
+    def __init__(self):
+        self._waiters = []
+
+    async def wait_for_event(self, event, predicate=None, timeout=None):
+        future = asyncio.get_running_loop().create_future()
+        self._waiters.append((event, predicate, future))
+        return await future
+
+    async def wait_for_load_state(self, state=None, timeout=None):
+        # The current document went idle long ago
+        return None
+
+    def emit(self, event, value):
+        for name, predicate, future in self._waiters:
+            if name == event and not future.done() and (predicate is None or predicate(value)):
+                future.set_result(value)
+
+
+@unittest.skipUnless(_HAVE_DEPS, "browser dependencies not installed")
+class RunUntilSettledTest(unittest.IsolatedAsyncioTestCase):
+    async def test_download_after_click_is_not_cut_off_by_an_idle_page(self):
+        from browser import BrowserManager
+
+        page = FakePage()
+        download = object()
+
+        async def click():
+            # The download starts from a handler a little after the click returns
+            asyncio.get_running_loop().call_later(0.05, page.emit, "download", download)
+
+        result = await BrowserManager._run_until_settled(page, click, timeout=3000)
+        self.assertIs(result, download)
+
+    async def test_network_idle_ends_the_wait_after_a_commit(self):
+        from browser import BrowserManager
+
+        page = FakePage()
+
+        async def click():
+            page.emit("framenavigated", SimpleNamespace(parent_frame=None))
+
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        result = await BrowserManager._run_until_settled(page, click, timeout=3000)
+        self.assertIsNone(result)
+        self.assertLess(loop.time() - started, 0.5)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,23 @@
+import unittest
+
+from mcp_module.web.html_text import _TextExtractor
+
+
+def _extract(html):
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    return extractor.parts
+
+
+class TextExtractorTest(unittest.TestCase):
+    def test_skips_head_and_scripts(self):
+        html = "<html><head><title>T</title></head><body><p>hi</p><script>x()</script>ok</body></html>"
+        self.assertEqual(_extract(html), ["hi", "ok"])
+
+    def test_missing_head_end_tag_keeps_the_body(self):
+        html = "<html><head><title>T</title><body><p>hi</p></body></html>"
+        self.assertEqual(_extract(html), ["hi"])
+
+
+if __name__ == "__main__":
+    unittest.main()
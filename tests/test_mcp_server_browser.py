@@ -0,0 +1,55 @@
+import asyncio
+import importlib.util
+import unittest
+from types import SimpleNamespace
+
+_DEPS = ("mcp", "uvicorn", "starlette", "playwright", "aiohttp", "aiofiles")
+_HAVE_DEPS = all(importlib.util.find_spec(name) for name in _DEPS)
+
+
+@unittest.skipUnless(_HAVE_DEPS, "server dependencies not installed")
+class DrainStreamTest(unittest.IsolatedAsyncioTestCase):
+    async def test_progress_is_sent_before_the_action_is_awaited(self):
+        from browser import Progress
+        from mcp_server_browser import GenericMCPServer
+
+        events = []
+
+        async def send_progress_notification(token, progress, message=None):
+            events.append(("progress", token, progress))
+
+        ctx = SimpleNamespace(
+            meta=SimpleNamespace(progressToken="tok"),
+            session=SimpleNamespace(send_progress_notification=send_progress_notification),
+        )
+
+        async def action():
+            events.append(("action",))
+            await asyncio.sleep(0)
+            return {"status": "ok"}
+
+        async def handler():
+            yield Progress(status="navigating")
+            yield await action()
+
+        result = await GenericMCPServer._drain_stream(ctx, handler())
+
+        self.assertEqual(events, [("progress", "tok", 1), ("action",)])
+        # A plain dict with a "status" key is still the result, not a status update
+        self.assertEqual(result, {"status": "ok"})
+
+    async def test_no_progress_token_still_returns_result(self):
+        from browser import Progress
+        from mcp_server_browser import GenericMCPServer
+
+        ctx = SimpleNamespace(meta=None, session=None)
+
+        async def handler():
+            yield Progress(status="clicking")
+            yield "done"
+
+        self.assertEqual(await GenericMCPServer._drain_stream(ctx, handler()), "done")
+
+
+if __name__ == "__main__":
+    unittest.main()
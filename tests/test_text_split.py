@@ -0,0 +1,49 @@
+import unittest
+
+from mcp_module.web.text_split import split_text
+
+
+def _squash(text):
+    """Text with all whitespace removed; chunks drop boundary whitespace but nothing else"""
+    return "".join(text.split())
+
+
+class SplitTextTest(unittest.TestCase):
+    def test_prefers_paragraph_over_newline_over_space(self):
+        text = "aaaa bbbb\ncccc\n\ndddd eeee"
+        # The window holds a space, a newline and a paragraph break: the paragraph wins
+        self.assertEqual(split_text(text, 16), ["aaaa bbbb\ncccc", "dddd eeee"])
+        # Without a paragraph break in range the newline wins over the space
+        self.assertEqual(split_text("aaaa bbbb\ncccc dddd", 16), ["aaaa bbbb", "cccc dddd"])
+        # Only spaces: cut at the last one in the window
+        self.assertEqual(split_text("aaaa bbbb cccc dddd", 12), ["aaaa bbbb", "cccc dddd"])
+
+    def test_hard_cut_without_separator(self):
+        self.assertEqual(split_text("abcdefghij", 4), ["abcd", "efgh", "ij"])
+
+    def test_chunks_respect_size_and_are_never_empty(self):
+        text = ("word " * 40 + "\n\n" + "\n" * 5 + "   ") * 10
+        chunks = split_text(text, 50)
+        self.assertTrue(chunks)
+        for chunk in chunks:
+            self.assertTrue(chunk)
+            self.assertEqual(chunk, chunk.strip())
+            self.assertLessEqual(len(chunk), 50)
+
+    def test_round_trip_keeps_all_non_whitespace_text(self):
+        text = "Lorem ipsum dolor sit amet,\nconsectetur adipiscing elit.\n\n" * 30 + "tail"
+        for size in (1, 7, 64, 1000):
+            self.assertEqual(_squash("".join(split_text(text, size))), _squash(text))
+
+    def test_empty_and_whitespace_only_text(self):
+        self.assertEqual(split_text("", 10), [])
+        self.assertEqual(split_text(" \n\n \n", 2), [])
+
+    def test_non_positive_chunk_size_is_rejected(self):
+        for size in (0, -1):
+            with self.assertRaises(ValueError):
+                split_text("abc", size)
+
+
+if __name__ == "__main__":
+    unittest.main()